@@ -0,0 +1,160 @@
+import sys
+import csv
+import json
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parseaddr, parsedate_to_datetime
+from functools import lru_cache
+from gmail_client import get_service
+from gmail_batch import (CallStats, DEFAULT_BATCH_SIZE, DEFAULT_WORKERS, batch_execute,
+                         chunked, iter_message_pages, thread_http)
+from label_cache import LabelIndex
+
+ANALYTICS_HEADERS = ['From', 'Date', 'List-Id']
+
+class MailboxStats:
+    """Counters over message metadata. Memory grows with distinct senders/labels, not messages."""
+
+    def __init__(self):
+        self.messages = 0
+        self.unread = 0
+        self.senders = Counter()
+        self.domains = Counter()
+        self.unread_by_domain = Counter()
+        self.lists = Counter()
+        self.months = Counter()
+        self.label_months = Counter()
+
+    def add(self, msg):
+        headers = {h['name'].lower(): h['value'] for h in msg.get('payload', {}).get('headers', [])}
+        address = sender_address(headers.get('from', ''))
+        domain = address.rpartition('@')[2] or '(unknown)'
+        labels = msg.get('labelIds', [])
+        month = message_month(msg, headers.get('date'))
+
+        self.messages += 1
+        self.senders[address] += 1
+        self.domains[domain] += 1
+        self.months[month] += 1
+        if 'UNREAD' in labels:
+            self.unread += 1
+            self.unread_by_domain[domain] += 1
+        if headers.get('list-id'):
+            self.lists[headers['list-id']] += 1
+        for label_id in labels:
+            self.label_months[(label_id, month)] += 1
+
+    def label_growth(self, months=6):
+        """Per-label counts for the last `months` months, fastest growing first."""
+        recent = sorted(m for m in self.months if m != '(unknown)')[-months:]
+        series = {}
+        for (label_id, month), count in self.label_months.items():
+            if month in recent:
+                series.setdefault(label_id, dict.fromkeys(recent, 0))[month] = count
+        growth = [
+            {'label': label_id, 'change': counts[recent[-1]] - counts[recent[0]], 'by_month': counts}
+            for label_id, counts in series.items()
+        ]
+        return sorted(growth, key=lambda row: row['change'], reverse=True)
+
+    def report(self, top=20, months=6, label_name=None):
+        label_name = label_name or (lambda label_id: label_id)
+        growth = self.label_growth(months)[:top]
+        for row in growth:
+            row['label'] = label_name(row['label'])
+        return {
+            'messages': self.messages,
+            'unread': self.unread,
+            'top_senders': dict(self.senders.most_common(top)),
+            'top_domains': dict(self.domains.most_common(top)),
+            'unread_by_domain': dict(self.unread_by_domain.most_common(top)),
+            'top_lists': dict(self.lists.most_common(top)),
+            'messages_by_month': dict(sorted(self.months.items())),
+            'label_growth': growth,
+        }
+
+    def write_csv(self, path, label_name=None):
+        """Write every counter in long form: metric, key, month, count."""
+        label_name = label_name or (lambda label_id: label_id)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['metric', 'key', 'month', 'count'])
+            for metric, counter in (('sender', self.senders), ('domain', self.domains),
+                                    ('unread_by_domain', self.unread_by_domain), ('list', self.lists)):
+                for key, count in counter.most_common():
+                    writer.writerow([metric, key, '', count])
+            for month, count in sorted(self.months.items()):
+                writer.writerow(['month', '', month, count])
+            for (label_id, month), count in sorted(self.label_months.items()):
+                writer.writerow(['label', label_name(label_id), month, count])
+
+@lru_cache(maxsize=65536)
+def sender_address(from_header):
+    # parseaddr dominates the per-message cost, and most mail comes from a few senders.
+    return parseaddr(from_header)[1].lower() or '(unknown)'
+
+def message_month(msg, date_header=None):
+    """YYYY-MM of a message, from internalDate or else its Date header."""
+    if msg.get('internalDate'):
+        return datetime.fromtimestamp(int(msg['internalDate']) / 1000, timezone.utc).strftime('%Y-%m')
+    try:
+        return parsedate_to_datetime(date_header).strftime('%Y-%m')
+    except (TypeError, ValueError):
+        return '(unknown)'
+
+def analyze_mailbox(query=None, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS,
+                    top=20, months=6, csv_path=None, stats=False):
+    service = get_service()
+    if not service:
+        return
+
+    call_stats = CallStats()
+    mailbox = MailboxStats()
+    messages = service.users().messages()
+    params = {'userId': 'me', 'format': 'metadata', 'metadataHeaders': ANALYTICS_HEADERS}
+
+    def fetch(ids):
+        requests = [(msg_id, messages.get(id=msg_id, **params)) for msg_id in ids]
+        results, errors = batch_execute(service, requests, batch_size=batch_size,
+                                        stats=call_stats, http=thread_http(service))
+        for msg_id, error in errors.items():
+            print(f"Warning: could not fetch message {msg_id}: {error}", file=sys.stderr)
+        return results.values()
+
+    try:
+        # One page of IDs is in flight at a time, split into batches across the workers.
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for ids, _ in iter_message_pages(service, query, stats=call_stats):
+                for results in pool.map(fetch, chunked(ids, batch_size)):
+                    for msg in results:
+                        mailbox.add(msg)
+                print(f"Analyzed {mailbox.messages} messages...", file=sys.stderr)
+
+        labels = LabelIndex(service)
+        labels.refresh()  # one call, so the report shows current label names
+        output = mailbox.report(top=top, months=months, label_name=labels.name)
+        if csv_path:
+            mailbox.write_csv(csv_path, label_name=labels.name)
+            output['csv'] = csv_path
+        if stats:
+            output['stats'] = call_stats.report(mailbox.messages)
+        print(json.dumps(output, indent=2))
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sender, domain, list and label statistics over the whole mailbox.')
+    parser.add_argument('--query', type=str, help='Only analyze messages matching this Gmail query (default: all mail)')
+    parser.add_argument('--top', type=int, default=20, help='Entries per ranking in the report')
+    parser.add_argument('--months', type=int, default=6, help='Months of history in the label growth table')
+    parser.add_argument('--csv', type=str, help='Also write every counter to this CSV file')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Messages per batch request (max 100)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Batch requests in flight at once')
+    parser.add_argument('--stats', action='store_true', help='Include HTTP round-trip counts and elapsed time in the output')
+
+    args = parser.parse_args()
+    analyze_mailbox(query=args.query, batch_size=args.batch_size, workers=args.workers,
+                    top=args.top, months=args.months, csv_path=args.csv, stats=args.stats)
@@ -1,22 +1,21 @@
 import os.path
+import argparse
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
+from gmail_client import SCOPES, FULL_ACCESS_SCOPE, CREDENTIALS_FILE, TOKEN_FILE
 
-# If modifying these scopes, delete the file token.json.
-SCOPES = ['https://www.googleapis.com/auth/gmail.readonly', 'https://www.googleapis.com/auth/gmail.modify', 'https://www.googleapis.com/auth/gmail.compose', 'https://www.googleapis.com/auth/gmail.send']
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-CREDENTIALS_FILE = os.path.join(BASE_DIR, 'credentials.json')
-TOKEN_FILE = os.path.join(BASE_DIR, 'token.json')
-
-def main():
+def main(full_access=False):
+    scopes = SCOPES + [FULL_ACCESS_SCOPE] if full_access else SCOPES
     creds = None
     # The file token.json stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first
     # time.
     if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+        creds = Credentials.from_authorized_user_file(TOKEN_FILE)
+        if not creds.has_scopes(scopes):
+            # Asking for a scope the token doesn't have needs a new consent.
+            creds = None
     
     # If there are no (valid) credentials available, let the user log in.
     if not creds or not creds.valid:
@@ -28,7 +27,7 @@ def main():
                 return
 
             flow = InstalledAppFlow.from_client_secrets_file(
-                CREDENTIALS_FILE, SCOPES)
+                CREDENTIALS_FILE, scopes)
             creds = flow.run_local_server(port=0)
         
         # Save the credentials for the next run
@@ -37,4 +36,8 @@ def main():
             print(f"Authentication successful! Token saved to {TOKEN_FILE}")
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Authorize the Gmail skill and save token.json.')
+    parser.add_argument('--full-access', action='store_true', help='Also grant full mailbox access (https://mail.google.com/), needed by delete_emails.py --permanent')
+    
+    args = parser.parse_args()
+    main(full_access=args.full_access)
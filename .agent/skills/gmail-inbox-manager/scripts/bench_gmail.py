@@ -0,0 +1,217 @@
+import argparse
+import base64
+import contextlib
+import io
+import itertools
+import json
+import os.path
+import sys
+import tempfile
+import time
+import tracemalloc
+import label_cache
+from compaction import Compactor
+from delete_emails import delete_messages
+from fetch_emails import fetch_emails
+from get_email_details import get_email_details
+from gmail_batch import DEFAULT_BATCH_SIZE, MAX_IDS_PER_CALL, chunked, iter_message_ids
+from gmail_replay import install, load_cassette, recording_service, replay_service, save_cassette
+from move_email import move_email
+
+SIZES = [10, 100, 1000]
+# Scenarios that only read mail and can be recorded against a live account.
+READ_ONLY = ('fetch_emails', 'get_email_details')
+BOUNDARY = 'batch_bench'
+# Differences below these are noise, whatever the relative change.
+MIN_DELTA = {'ms': 20, 'peak_kb': 256}
+
+def b64(text):
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+def synthetic_message(i):
+    """A full-format message with plain/HTML alternatives, a quoted reply, a signature and an attachment."""
+    plain = (f"Hi,\n\nUpdate {i}: the quarterly numbers are attached. " + "Revenue is up on last quarter. " * 20 +
+             "\n\nBest regards,\nJane Doe\nFinance | Example Corp\n\n"
+             "On Mon, 1 Jan 2024 at 09:00, Bob <bob@example.com> wrote:\n" + "> earlier message\n" * 20)
+    html = "<html><body><p>" + plain.replace('\n\n', '</p><p>') + "</p></body></html>"
+    return {
+        'id': f'm{i}', 'threadId': f't{i}', 'labelIds': ['INBOX', 'UNREAD'], 'snippet': f'Update {i}',
+        'historyId': '1000', 'internalDate': str(1700000000000 + i * 60000), 'sizeEstimate': 8000,
+        'payload': {
+            'mimeType': 'multipart/mixed',
+            'headers': [
+                {'name': 'Subject', 'value': f'Quarterly update {i}'},
+                {'name': 'From', 'value': 'Jane Doe <jane@example.com>'},
+                {'name': 'Date', 'value': 'Mon, 1 Jan 2024 10:00:00 +0000'},
+            ],
+            'parts': [
+                {'partId': '0', 'mimeType': 'multipart/alternative', 'filename': '', 'parts': [
+                    {'partId': '0.0', 'mimeType': 'text/plain', 'filename': '', 'body': {'data': b64(plain)}},
+                    {'partId': '0.1', 'mimeType': 'text/html', 'filename': '', 'body': {'data': b64(html)}},
+                ]},
+                {'partId': '1', 'mimeType': 'application/pdf', 'filename': f'report-{i}.pdf',
+                 'body': {'attachmentId': f'att{i}', 'size': 50000}},
+            ],
+        },
+    }
+
+def json_response(obj, status=200):
+    return {'status': status, 'content_type': 'application/json; charset=UTF-8',
+            'body': json.dumps(obj)}
+
+def batch_response(objs):
+    parts = [
+        f"--{BOUNDARY}\r\nContent-Type: application/http\r\nContent-ID: <response-{n} + {n}>\r\n\r\n"
+        f"HTTP/1.1 200 OK\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n{json.dumps(obj)}\r\n"
+        for n, obj in enumerate(objs)
+    ]
+    return {'status': 200, 'content_type': f'multipart/mixed; boundary={BOUNDARY}',
+            'body': ''.join(parts) + f"--{BOUNDARY}--"}
+
+def empty_response():
+    return {'status': 204, 'content_type': 'application/json', 'body': ''}
+
+def synthetic_cassette(scenario, n):
+    """The exchanges each scenario makes for `n` messages, with generated responses."""
+    ids = [f'm{i}' for i in range(n)]
+    interactions = []
+    if scenario == 'fetch_emails':
+        pages = list(chunked(ids, 500))
+        for index, page in enumerate(pages):
+            listing = {'messages': [{'id': i, 'threadId': i} for i in page]}
+            if index < len(pages) - 1:
+                listing['nextPageToken'] = f'page{index + 1}'
+            interactions.append(json_response(listing))
+            for chunk in chunked(page, DEFAULT_BATCH_SIZE):
+                interactions.append(batch_response([synthetic_message(int(i[1:])) for i in chunk]))
+    elif scenario == 'get_email_details':
+        interactions = [json_response(synthetic_message(i)) for i in range(n)]
+    elif scenario in ('delete_messages', 'move_email'):
+        if scenario == 'move_email':
+            interactions.append(json_response({'labels': [
+                {'id': 'INBOX', 'name': 'INBOX'}, {'id': 'Label_1', 'name': 'Receipts'}]}))
+        interactions.extend(empty_response() for _ in chunked(ids, MAX_IDS_PER_CALL))
+    return {'meta': {'ids': ids}, 'interactions': interactions}
+
+def run_scenario(scenario, ids):
+    if scenario == 'fetch_emails':
+        fetch_emails(limit=len(ids), query=None, compactor=Compactor())
+    elif scenario == 'get_email_details':
+        for message_id in ids:
+            get_email_details(message_id)
+    elif scenario == 'delete_messages':
+        delete_messages(ids)
+    elif scenario == 'move_email':
+        move_email(ids, ['Receipts'], ['INBOX'])
+
+def measure(scenario, cassette, trace_memory=False):
+    service, http = replay_service(cassette['interactions'])
+    install(service)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Start every run with an empty label cache so call counts are reproducible.
+        label_cache.LABEL_CACHE_FILE = os.path.join(tmp, 'labels_cache.json')
+        output = io.StringIO()
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            run_scenario(scenario, cassette['meta']['ids'])
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+    install(None)
+
+    if 'error occurred' in output.getvalue():
+        raise RuntimeError(f"{scenario} failed on replay: {output.getvalue().strip()[-300:]}")
+    return {'ms': round(elapsed * 1000, 1), 'calls': http.calls, 'unused': http.remaining, 'peak_kb': peak and round(peak / 1024)}
+
+def bench(scenarios, sizes, cassette_dir=None, repeat=3):
+    results = {}
+    for scenario in scenarios:
+        for n in sizes:
+            path = cassette_dir and os.path.join(cassette_dir, f'{scenario}-{n}.json')
+            if path and os.path.exists(path):
+                cassette, source = load_cassette(path), 'recorded'
+            else:
+                cassette, source = synthetic_cassette(scenario, n), 'synthetic'
+
+            runs = [measure(scenario, cassette) for _ in range(repeat)]
+            memory = measure(scenario, cassette, trace_memory=True)
+            results[f'{scenario}/{n}'] = {
+                'source': source,
+                'ms': min(r['ms'] for r in runs),
+                'calls': runs[0]['calls'],
+                'unused_responses': runs[0]['unused'],
+                'peak_kb': memory['peak_kb'],
+            }
+            print(f"{scenario}/{n}: {results[f'{scenario}/{n}']}", file=sys.stderr)
+    return results
+
+def record(cassette_dir, sizes):
+    """Record the read-only scenarios against the live account."""
+    os.makedirs(cassette_dir, exist_ok=True)
+    for n in sizes:
+        service, recorder = recording_service()
+        if not service:
+            return
+        ids = list(itertools.islice(iter_message_ids(service), n))
+        for scenario in READ_ONLY:
+            recorder.interactions = []
+            install(service)
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_scenario(scenario, ids)
+            install(None)
+            path = os.path.join(cassette_dir, f'{scenario}-{n}.json')
+            save_cassette(path, recorder.interactions, meta={'ids': ids})
+            print(f"Recorded {len(recorder.interactions)} exchanges to {path}")
+
+def compare(results, baseline, tolerance):
+    """Return regressions: more API calls than the baseline, or time/memory beyond the tolerance."""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if current['calls'] > base['calls']:
+            regressions.append(f"{key}: {current['calls']} API calls (baseline {base['calls']})")
+        for metric, min_delta in MIN_DELTA.items():
+            if (base.get(metric) and current[metric] > base[metric] * (1 + tolerance)
+                    and current[metric] - base[metric] > min_delta):
+                regressions.append(f"{key}: {metric} {current[metric]} (baseline {base[metric]})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the Gmail scripts over recorded or synthetic API exchanges.')
+    parser.add_argument('--scenarios', nargs='+', choices=['fetch_emails', 'get_email_details', 'delete_messages', 'move_email'],
+                        default=['fetch_emails', 'get_email_details', 'delete_messages', 'move_email'])
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES, help='Message counts to benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case (the fastest is reported)')
+    parser.add_argument('--cassettes', type=str, help='Replay <scenario>-<n>.json cassettes from this directory when present')
+    parser.add_argument('--record', type=str, metavar='DIR', help='Record read-only scenarios against the live account into DIR and exit')
+    parser.add_argument('--baseline', type=str, help='Compare against this results file and exit 1 on regressions')
+    parser.add_argument('--save-baseline', type=str, help='Write the results to this file')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='Allowed relative slowdown/memory growth against the baseline')
+
+    args = parser.parse_args()
+    if args.record:
+        record(args.record, args.sizes)
+        return 0
+
+    results = bench(args.scenarios, args.sizes, args.cassettes, args.repeat)
+    print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import argparse
+import email
+import glob
+import json
+import os.path
+import time
+from email import policy
+from html_text import html_to_text
+from mailbox_mirror import MailboxMirror
+from mime_walker import decode_part, iter_text_parts
+
+def load_corpus(corpus_dir=None, mirror_limit=0):
+    """Collect HTML bodies from saved .html/.eml/.json files and/or the local mirror."""
+    docs = []
+    if corpus_dir:
+        for path in sorted(glob.glob(os.path.join(corpus_dir, '**', '*'), recursive=True)):
+            ext = os.path.splitext(path)[1].lower()
+            if ext in ('.html', '.htm'):
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    docs.append(f.read())
+            elif ext == '.eml':
+                with open(path, 'rb') as f:
+                    msg = email.message_from_binary_file(f, policy=policy.default)
+                part = msg.get_body(preferencelist=('html',))
+                if part is not None:
+                    docs.append(part.get_content())
+            elif ext == '.json':
+                # Gmail API message resources (format=full)
+                with open(path) as f:
+                    msg = json.load(f)
+                docs.extend(decode_part(p) for p in iter_text_parts(msg.get('payload', {}), 'text/html'))
+
+    if mirror_limit:
+        mirror = MailboxMirror()
+        try:
+            for msg in mirror.query("", mirror_limit):
+                docs.extend(decode_part(p) for p in iter_text_parts(msg['payload'], 'text/html'))
+        finally:
+            mirror.close()
+
+    return docs
+
+def time_extractor(extract, docs, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for doc in docs:
+            extract(doc)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 1)
+
+def bench(corpus_dir=None, mirror_limit=0, repeat=3):
+    docs = load_corpus(corpus_dir, mirror_limit)
+    if not docs:
+        print("Error: No HTML bodies found. Pass --corpus DIR or --from-mirror N.")
+        return
+
+    results = {
+        'documents': len(docs),
+        'bytes': sum(len(d.encode('utf-8')) for d in docs),
+        'repeat': repeat,
+        'html_to_text_ms': time_extractor(html_to_text, docs, repeat),
+    }
+
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        results['beautifulsoup_ms'] = None
+        results['note'] = 'beautifulsoup4 is not installed; pip install beautifulsoup4 to compare'
+    else:
+        # The previous clean_body() implementation.
+        bs4_extract = lambda doc: BeautifulSoup(doc, 'html.parser').get_text(separator=' ', strip=True)
+        results['beautifulsoup_ms'] = time_extractor(bs4_extract, docs, repeat)
+        results['speedup'] = round(results['beautifulsoup_ms'] / max(results['html_to_text_ms'], 0.1), 2)
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark html_to_text() against the BeautifulSoup clean_body() path.')
+    parser.add_argument('--corpus', help='Directory of saved emails (.html, .eml or Gmail API .json)')
+    parser.add_argument('--from-mirror', type=int, default=0, metavar='N', help='Also use HTML bodies of the N newest mirrored messages')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per extractor; the best time is reported')
+
+    args = parser.parse_args()
+    bench(corpus_dir=args.corpus, mirror_limit=args.from_mirror, repeat=args.repeat)
@@ -0,0 +1,66 @@
+import argparse
+import json
+import os.path
+import statistics
+import subprocess
+import sys
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Each snippet runs in a fresh interpreter, as the scripts do when the agent calls them.
+# Without a usable token.json both paths build with the same placeholder credentials.
+CREDENTIALS = '''
+import gmail_client
+from google.oauth2.credentials import Credentials
+creds = None
+if os.path.exists(gmail_client.TOKEN_FILE):
+    creds = Credentials.from_authorized_user_file(gmail_client.TOKEN_FILE, gmail_client.SCOPES)
+if not creds or not creds.valid:
+    creds = Credentials(token='bench')
+'''
+
+VARIANTS = {
+    'interpreter': 'pass',
+    # What every script did before gmail_client.py: build() resolves the discovery
+    # document on each run (from the network on google-api-python-client < 2.0).
+    'build': 'import os.path' + CREDENTIALS + '''
+from googleapiclient.discovery import build
+build('gmail', 'v1', credentials=creds)
+''',
+    'gmail_client': 'import os.path' + CREDENTIALS + '''
+gmail_client.build_service(creds)
+''',
+}
+
+def time_variant(code, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=SCRIPTS_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def bench_startup(runs=10):
+    # Warm the discovery cache and the OS file cache before timing.
+    for code in VARIANTS.values():
+        time_variant(code, 1)
+
+    results = {}
+    for name, code in VARIANTS.items():
+        timings = time_variant(code, runs)
+        results[name] = {
+            'median_ms': round(statistics.median(timings), 1),
+            'min_ms': round(min(timings), 1),
+        }
+    results['saved_per_invocation_ms'] = round(
+        results['build']['median_ms'] - results['gmail_client']['median_ms'], 1)
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure per-invocation Gmail client startup time.')
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters started per variant')
+
+    args = parser.parse_args()
+    bench_startup(args.runs)
@@ -0,0 +1,239 @@
+"""
+Shrinks email bodies for agent-facing output without losing new content.
+
+Quoted history, signatures, legal disclaimers and footers repeated across
+messages are removed first; only then is the remaining text cut to the
+character or token budget, so the budget is spent on what each message adds.
+"""
+
+import re
+from collections import OrderedDict
+from email.utils import parseaddr
+
+# "On Mon, 1 Jan 2024 at 10:00, Jane <jane@example.com> wrote:" (often wrapped over two lines)
+REPLY_HEADER = re.compile(r'^\s*On\b.{0,300}\bwrote:\s*$', re.S)
+# Outlook and other clients that quote with a header block instead of '>'.
+ORIGINAL_MESSAGE = re.compile(r'^\s*-{2,}\s*Original Message\s*-{2,}\s*$', re.I)
+OUTLOOK_SEPARATOR = re.compile(r'^\s*_{10,}\s*$')
+HEADER_FIELD = re.compile(r'^\s*\**(From|Sent|Date|To|Subject|Cc)\**\s*:', re.I)
+
+
+def _starts_outlook_header(lines, i):
+    # A "From:" line followed closely by Sent:/Date: and Subject: fields.
+    if not re.match(r'^\s*\**From\**\s*:', lines[i], re.I):
+        return False
+    fields = {HEADER_FIELD.match(line).group(1).lower()
+              for line in lines[i + 1:i + 6] if HEADER_FIELD.match(line)}
+    return ('sent' in fields or 'date' in fields) and 'subject' in fields
+
+
+def _is_quote_start(lines, i):
+    line = lines[i]
+    if REPLY_HEADER.match(line) or ORIGINAL_MESSAGE.match(line) or _starts_outlook_header(lines, i):
+        return True
+    if line.lstrip().startswith('On ') and i + 1 < len(lines):
+        return bool(REPLY_HEADER.match(line + ' ' + lines[i + 1]))
+    if OUTLOOK_SEPARATOR.match(line):
+        return any(_starts_outlook_header(lines, j) for j in range(i + 1, min(i + 3, len(lines))))
+    return False
+
+
+def strip_quoted(text):
+    """Remove quoted reply history: '>' lines and everything below a reply header."""
+    lines = text.split('\n')
+    kept = []
+    for i, line in enumerate(lines):
+        if _is_quote_start(lines, i):
+            break
+        if not line.lstrip().startswith('>'):
+            kept.append(line)
+    return '\n'.join(kept).strip()
+
+
+# RFC 3676 signature delimiter, and the one-line signatures mobile clients append.
+SIGNATURE_DELIMITER = re.compile(r'^-- ?$')
+MOBILE_SIGNATURE = re.compile(
+    r'^\s*(Sent from my \w+|Sent from (Mail|Outlook|Yahoo Mail) for \w+|Get Outlook for \w+)', re.I)
+VALEDICTION = re.compile(
+    r'^\s*(best( regards| wishes)?|kind regards|regards|many thanks|thanks( again)?|thank you|cheers|'
+    r'sincerely|warm regards|all the best)[,.!]?\s*$', re.I)
+# A signature block starts within this many lines of the end of the message.
+SIGNATURE_MAX_LINES = 8
+SIGNATURE_LINE_MAX_CHARS = 72
+PHONE = re.compile(r'\+?\(?\d[\d\s().-]{6,}\d')
+EMAIL_OR_URL = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+|https?://|www\.', re.I)
+NAME = re.compile(r"^[^\W\d_][\w'’.-]*(\s+[^\W\d_][\w'’.-]*){0,3},?$")
+# Words that end in a full stop without ending a sentence ("Acme Inc.", "J. Doe").
+ABBREVIATIONS = {'inc', 'ltd', 'co', 'corp', 'llc', 'plc', 'gmbh', 'jr', 'sr', 'dr', 'st', 'phd'}
+
+# Only paragraphs at the end of a message with at least this many different
+# boilerplate phrases are dropped; one "privacy policy" may be the content.
+DISCLAIMER = re.compile(
+    r'confidentiality notice|(privileged|confidential) (and|or) (privileged|confidential)|'
+    r'contains? confidential|intended (solely |only )?for the (use of the )?(individual|addressee|recipient)|'
+    r'received this (e-?mail|message|communication) in error|'
+    r'unsubscribe|you are receiving this|manage (your )?(email )?preferences|view (this email )?in (your )?browser|'
+    r'privacy policy|all rights reserved', re.I)
+DISCLAIMER_MIN_SIGNALS = 2
+# Long paragraphs that merely mention "confidential" are content, not boilerplate.
+DISCLAIMER_MAX_CHARS = 600
+
+# Paragraphs shorter than this are too generic ("Thanks!") to count as footers.
+FOOTER_MIN_CHARS = 40
+FOOTER_MEMORY = 4096
+# Trailing paragraphs of each message remembered as its sender's possible footer.
+FOOTER_TAIL = 3
+
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = ' [...]'
+
+
+def _is_sentence(line):
+    words = line.split()
+    if line.endswith(('?', '!')):
+        return True
+    if not line.endswith('.'):
+        return False
+    last = words[-1].rstrip('.').lower()
+    return not (last in ABBREVIATIONS or len(last) <= 1)
+
+
+def _is_signature_block(lines):
+    """True if `lines` read as a name/title/contact block: short lines, no sentences."""
+    lines = [line.strip() for line in lines if line.strip()]
+    if not lines:
+        return True
+    if any(len(line) > SIGNATURE_LINE_MAX_CHARS or _is_sentence(line) for line in lines):
+        return False
+    return any(PHONE.search(line) or EMAIL_OR_URL.search(line)
+               or (NAME.match(line) and line[0].isupper()) for line in lines)
+
+
+def strip_signature(text):
+    """Cut a trailing signature block: '-- ' delimiter, mobile signature or valediction.
+
+    The marker has to start one of the last SIGNATURE_MAX_LINES lines and be
+    followed only by signature-like lines, so a "Thanks." or "--" in the
+    middle of a message doesn't cut what comes after it.
+    """
+    lines = text.rstrip().split('\n')
+    for i in range(max(0, len(lines) - SIGNATURE_MAX_LINES - 1), len(lines)):
+        line = lines[i]
+        if SIGNATURE_DELIMITER.match(line) or MOBILE_SIGNATURE.match(line):
+            if _is_signature_block(lines[i + 1:]):
+                return '\n'.join(lines[:i]).strip()
+        elif VALEDICTION.match(line) and _is_signature_block(lines[i + 1:]):
+            # Keep the sign-off line itself; drop the name/title/phone block under it.
+            return '\n'.join(lines[:i + 1]).strip()
+    return text
+
+
+def paragraphs(text):
+    return [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
+
+
+def _is_disclaimer(paragraph):
+    if len(paragraph) > DISCLAIMER_MAX_CHARS:
+        return False
+    signals = {match.group(0).lower() for match in DISCLAIMER.finditer(paragraph)}
+    return len(signals) >= DISCLAIMER_MIN_SIGNALS
+
+
+def strip_disclaimers(text):
+    """Drop the legal or mailing-list boilerplate paragraphs that end a message.
+
+    The first paragraph is always kept: boilerplate follows content.
+    """
+    kept = paragraphs(text)
+    while len(kept) > 1 and _is_disclaimer(kept[-1]):
+        kept.pop()
+    return '\n\n'.join(kept)
+
+
+class FooterTracker:
+    """Remembers each sender's trailing paragraphs and drops them when they repeat.
+
+    The first message from a sender keeps its footer; the next ones don't
+    repeat it. Only paragraphs at the end of a message are candidates, the
+    first paragraph is always kept, and a message identical to an earlier
+    one from the same sender (a repeated alert, say) is left whole.
+    Memory is bounded to the most recent FOOTER_MEMORY entries.
+    """
+
+    def __init__(self, capacity=FOOTER_MEMORY):
+        self.capacity = capacity
+        self._seen = OrderedDict()
+
+    def _remember(self, key):
+        self._seen[key] = True
+        self._seen.move_to_end(key)
+        if len(self._seen) > self.capacity:
+            self._seen.popitem(last=False)
+
+    def strip(self, text, sender=None):
+        owner = parseaddr(sender or '')[1].lower()
+        parts = paragraphs(text)
+        keys = [('footer', owner, ' '.join(p.split()).lower()) for p in parts]
+        message_key = ('message', owner, hash(tuple(key[2] for key in keys)))
+
+        keep = len(parts)
+        if message_key not in self._seen:
+            while keep > 1 and len(keys[keep - 1][2]) >= FOOTER_MIN_CHARS and keys[keep - 1] in self._seen:
+                keep -= 1
+
+        self._remember(message_key)
+        for key in keys[-FOOTER_TAIL:]:
+            if len(key[2]) >= FOOTER_MIN_CHARS:
+                self._remember(key)
+        return '\n\n'.join(parts[:keep])
+
+
+def truncate(text, max_chars=None, max_tokens=None):
+    """Cut `text` to the budget, preferring a paragraph or sentence boundary.
+
+    Tokens are estimated at CHARS_PER_TOKEN characters each.
+    """
+    limits = [n for n in (max_chars, max_tokens and max_tokens * CHARS_PER_TOKEN) if n]
+    if not limits or len(text) <= min(limits):
+        return text
+    limit = min(limits) - len(TRUNCATION_MARKER)
+    cut = text[:limit]
+    # Don't give up more than a fifth of the budget to end on a boundary.
+    boundary = max(cut.rfind('\n\n'), cut.rfind('. '), cut.rfind('\n'))
+    if boundary >= limit * 0.8:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + TRUNCATION_MARKER
+
+
+class Compactor:
+    """Applies every compaction stage and counts the bytes it saved."""
+
+    def __init__(self, max_chars=2000, max_tokens=None):
+        self.max_chars = max_chars
+        self.max_tokens = max_tokens
+        self.footers = FooterTracker()
+        self.messages = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def compact(self, text, sender=None):
+        compacted = strip_quoted(text)
+        compacted = strip_signature(compacted)
+        compacted = strip_disclaimers(compacted)
+        compacted = self.footers.strip(compacted, sender)
+        compacted = truncate(compacted, self.max_chars, self.max_tokens)
+
+        self.messages += 1
+        self.bytes_in += len(text.encode('utf-8'))
+        self.bytes_out += len(compacted.encode('utf-8'))
+        return compacted
+
+    def report(self):
+        saved = self.bytes_in - self.bytes_out
+        return {
+            'messages': self.messages,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'bytes_saved': saved,
+            'saved_pct': round(100 * saved / self.bytes_in, 1) if self.bytes_in else 0.0,
+        }
@@ -1,29 +1,7 @@
 import argparse
-import os.path
 import base64
 from email.message import EmailMessage
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-
-SCOPES = ['https://www.googleapis.com/auth/gmail.compose']
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-TOKEN_FILE = os.path.join(BASE_DIR, 'token.json')
-
-def get_service():
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            print("Error: Valid token not found.")
-            return None
-
-    return build('gmail', 'v1', credentials=creds)
+from gmail_client import get_service
 
 def create_draft(to, subject, body, thread_id=None):
     service = get_service()
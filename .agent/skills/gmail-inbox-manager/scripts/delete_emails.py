@@ -1,50 +1,58 @@
 import argparse
-import os.path
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from gmail_client import FULL_ACCESS_SCOPE, get_service, granted_scopes
+from gmail_batch import DEFAULT_WORKERS, collect_message_ids, run_chunks
 
-# Updated SCOPES to include modify for deletion
-SCOPES = ['https://www.googleapis.com/auth/gmail.readonly', 'https://www.googleapis.com/auth/gmail.modify', 'https://www.googleapis.com/auth/gmail.compose', 'https://www.googleapis.com/auth/gmail.send']
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-TOKEN_FILE = os.path.join(BASE_DIR, 'token.json')
-
-def get_service():
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            print("Error: Valid token not found. Please run auth.py first to authenticate.")
-            return None
-
-    return build('gmail', 'v1', credentials=creds)
+def delete_messages(message_ids, use_stdin=False, query=None, permanent=False, workers=DEFAULT_WORKERS):
+    if permanent and FULL_ACCESS_SCOPE not in granted_scopes():
+        print(f"Error: --permanent needs the {FULL_ACCESS_SCOPE} scope, which token.json was not authorized for. "
+              "Run auth.py --full-access once, or leave out --permanent to move the messages to Trash.")
+        return
 
-def delete_messages(message_ids):
     service = get_service()
     if not service:
         return
 
     try:
+        message_ids = collect_message_ids(service, message_ids, use_stdin, query)
         if not message_ids:
             print("No message IDs provided for deletion.")
             return
 
-        # Batch delete
-        for msg_id in message_ids:
-            service.users().messages().trash(userId='me', id=msg_id).execute()
-        print(f"Successfully trashed messages with IDs: {', '.join(message_ids)}")
+        messages = service.users().messages()
+        if permanent:
+            # batchDelete needs FULL_ACCESS_SCOPE, checked above.
+            make_request = lambda ids: messages.batchDelete(userId='me', body={'ids': ids})
+            action = 'deleted'
+        else:
+            # Adding the TRASH label moves messages to Trash like messages().trash(), but 1000 IDs per call.
+            make_request = lambda ids: messages.batchModify(userId='me', body={'ids': ids, 'addLabelIds': ['TRASH']})
+            action = 'trashed'
+
+        reports = run_chunks(service, message_ids, make_request, workers=workers)
+
+        for report in reports:
+            if report['ok']:
+                print(f"Chunk {report['chunk']}/{len(reports)}: {action} {report['count']} messages ({report['elapsed_ms']} ms)")
+            else:
+                print(f"Chunk {report['chunk']}/{len(reports)}: failed for {report['count']} messages: {report['error']}")
+
+        succeeded = sum(r['count'] for r in reports if r['ok'])
+        failed = len(message_ids) - succeeded
+        print(f"Successfully {action} {succeeded} of {len(message_ids)} messages" + (f" ({failed} failed)" if failed else ""))
 
     except Exception as e:
         print(f"An error occurred during message deletion: {e}")
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Delete Gmail messages.')
-    parser.add_argument('message_ids', nargs='+', help='List of message IDs to delete')
+    parser.add_argument('message_ids', nargs='*', help='List of message IDs to delete')
+    parser.add_argument('--stdin', action='store_true', help='Also read whitespace-separated message IDs from stdin')
+    parser.add_argument('--query', type=str, help='Also delete every message matching this Gmail query')
+    parser.add_argument('--permanent', action='store_true', help='Permanently delete instead of moving to Trash (run auth.py --full-access once first)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Chunks of 1000 IDs to process concurrently')
     
     args = parser.parse_args()
-    delete_messages(args.message_ids)
+    if not (args.message_ids or args.stdin or args.query):
+        parser.error('provide message IDs, --stdin or --query')
+    delete_messages(args.message_ids, use_stdin=args.stdin, query=args.query,
+                    permanent=args.permanent, workers=args.workers)
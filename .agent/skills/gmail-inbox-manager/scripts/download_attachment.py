@@ -1,29 +1,37 @@
 import os.path
 import base64
+import hashlib
 import json
+import shutil
+import tempfile
 import argparse
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-
-SCOPES = ['https://www.googleapis.com/auth/gmail.readonly', 'https://www.googleapis.com/auth/gmail.modify', 'https://www.googleapis.com/auth/gmail.compose', 'https://www.googleapis.com/auth/gmail.send']
+from concurrent.futures import ThreadPoolExecutor
+from gmail_client import get_service
+from gmail_batch import DEFAULT_WORKERS, batch_get_messages, iter_message_pages, thread_http
+from mime_walker import iter_attachment_parts, walk_parts
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-TOKEN_FILE = os.path.join(BASE_DIR, 'token.json')
 
-def get_service():
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            print("Error: Valid token not found. Please run auth.py first to authenticate.")
-            return None
+# Attachments are stored once per SHA-256 under STORE_DIR and linked into save dirs.
+STORE_DIR = os.path.join(BASE_DIR, 'attachments')
+INDEX_FILE = os.path.join(STORE_DIR, 'index.json')
+
+# Base64 characters decoded per step (a multiple of 4), bounding the decoded copy held in memory.
+DECODE_CHUNK = 4 * 256 * 1024
+
+# Messages listed and processed per round with --all --query.
+PAGE_SIZE = 100
 
-    return build('gmail', 'v1', credentials=creds)
+def parts_mask(depth=6):
+    """Partial-response mask for the part tree without any body data, `depth` levels deep."""
+    part = 'partId,mimeType,filename,body/attachmentId,body/size'
+    mask = part
+    for _ in range(depth - 1):
+        mask = f"{part},parts({mask})"
+    return f"id,payload({mask})"
+
+# Just enough of each message to find its attachments.
+ATTACHMENT_FIELDS = parts_mask()
 
 def download_attachment(message_id, attachment_id, filename, save_path):
     service = get_service()
@@ -47,13 +55,155 @@ def download_attachment(message_id, attachment_id, filename, save_path):
         print(f"An error occurred downloading attachment: {e}")
         return None
 
+def load_index():
+    if not os.path.exists(INDEX_FILE):
+        return {}
+    with open(INDEX_FILE) as f:
+        return json.load(f)
+
+def save_index(index):
+    os.makedirs(STORE_DIR, exist_ok=True)
+    with open(INDEX_FILE, 'w') as f:
+        json.dump(index, f, indent=2)
+
+def blob_path(sha256):
+    return os.path.join(STORE_DIR, sha256[:2], sha256)
+
+def store_blob(data):
+    """Decode base64url `data` into the content store in chunks. Returns (sha256, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    os.makedirs(STORE_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=STORE_DIR, delete=False) as tmp:
+        for start in range(0, len(data), DECODE_CHUNK):
+            chunk = data[start:start + DECODE_CHUNK]
+            chunk += '=' * (-len(chunk) % 4)
+            decoded = base64.urlsafe_b64decode(chunk)
+            digest.update(decoded)
+            size += len(decoded)
+            tmp.write(decoded)
+
+    sha256 = digest.hexdigest()
+    path = blob_path(sha256)
+    if os.path.exists(path):
+        os.remove(tmp.name)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp.name, path)
+    return sha256, size
+
+def link_blob(sha256, save_dir, filename):
+    """Expose a stored blob under its friendly name, preferring a hardlink."""
+    os.makedirs(save_dir, exist_ok=True)
+    filename = os.path.basename(filename) or sha256
+    target = os.path.join(save_dir, filename)
+    if os.path.exists(target):
+        if os.path.samefile(target, blob_path(sha256)) or file_sha256(target) == sha256:
+            return target
+        # Same name, different content: disambiguate with the hash.
+        root, ext = os.path.splitext(filename)
+        target = os.path.join(save_dir, f"{root}-{sha256[:8]}{ext}")
+        if os.path.exists(target):
+            return target
+
+    try:
+        os.link(blob_path(sha256), target)
+    except OSError:
+        try:
+            os.symlink(blob_path(sha256), target)
+        except OSError:
+            shutil.copyfile(blob_path(sha256), target)
+    return target
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def fetch_attachment(service, message_id, part, index):
+    """Download one attachment part into the store unless it is already there."""
+    key = f"{message_id}/{part.get('partId', '')}"
+    known = index.get(key)
+    if known and os.path.exists(blob_path(known['sha256'])):
+        return key, dict(known, status='skipped')
+
+    if 'data' in part['body']:
+        data = part['body']['data']
+    elif 'attachmentId' in part['body']:
+        attachment = service.users().messages().attachments().get(
+            userId='me', messageId=message_id, id=part['body']['attachmentId']
+        ).execute(http=thread_http(service))
+        data = attachment['data']
+    else:
+        # Small parts are inlined in the message, which ATTACHMENT_FIELDS leaves out.
+        msg = service.users().messages().get(
+            userId='me', id=message_id, format='full'
+        ).execute(http=thread_http(service))
+        data = next((p['body'].get('data', '') for p in walk_parts(msg['payload'])
+                     if p.get('partId') == part.get('partId')), '')
+        del msg
+
+    sha256, size = store_blob(data)
+    del data
+    return key, {'message_id': message_id, 'filename': part['filename'], 'mimeType': part['mimeType'],
+                 'sha256': sha256, 'size': size, 'status': 'downloaded'}
+
+def download_all_attachments(save_dir, message_id=None, query=None, workers=DEFAULT_WORKERS):
+    service = get_service()
+    if not service:
+        return
+
+    try:
+        index = load_index()
+        results = []
+
+        def run(job):
+            msg_id, part = job
+            try:
+                return fetch_attachment(service, msg_id, part, index)
+            except Exception as e:
+                return None, {'message_id': msg_id, 'filename': part['filename'], 'status': 'error', 'error': str(e)}
+
+        # One page of messages at a time, each fetched as its part tree only, so
+        # memory stays bounded however many messages match.
+        pages = [([message_id], None)] if message_id else iter_message_pages(service, query, page_size=PAGE_SIZE)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for message_ids, _ in pages:
+                messages = batch_get_messages(service, message_ids, fmt='full', fields=ATTACHMENT_FIELDS)
+                jobs = [(msg['id'], part) for msg in messages for part in iter_attachment_parts(msg['payload'])]
+                del messages
+                for key, result in pool.map(run, jobs):
+                    if result['status'] != 'error':
+                        index[key] = {k: result[k] for k in ('message_id', 'filename', 'mimeType', 'sha256', 'size')}
+                        result['path'] = link_blob(result['sha256'], save_dir, result['filename'])
+                    results.append(result)
+                save_index(index)
+        print(json.dumps(results, indent=2))
+        return results
+
+    except Exception as e:
+        print(f"An error occurred downloading attachments: {e}")
+        return None
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Download Gmail message attachment.')
-    parser.add_argument('--message_id', required=True, help='The ID of the message containing the attachment.')
-    parser.add_argument('--attachment_id', required=True, help='The ID of the attachment to download.')
-    parser.add_argument('--filename', required=True, help='The original filename of the attachment.')
+    parser.add_argument('--message_id', help='The ID of the message containing the attachment.')
+    parser.add_argument('--attachment_id', help='The ID of the attachment to download.')
+    parser.add_argument('--filename', help='The original filename of the attachment.')
     parser.add_argument('--save_dir', required=True, help='The directory to save the attachment.')
+    parser.add_argument('--all', action='store_true', help='Download every attachment of --message_id, or of every message matching --query.')
+    parser.add_argument('--query', help='Gmail query selecting messages for --all.')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Parallel downloads for --all.')
     
     args = parser.parse_args()
-    save_path = os.path.join(args.save_dir, args.filename)
-    download_attachment(args.message_id, args.attachment_id, args.filename, save_path)
+    if args.all:
+        if not (args.message_id or args.query):
+            parser.error('--all needs --message_id or --query')
+        download_all_attachments(args.save_dir, message_id=args.message_id, query=args.query, workers=args.workers)
+    else:
+        if not (args.message_id and args.attachment_id and args.filename):
+            parser.error('--message_id, --attachment_id and --filename are required without --all')
+        save_path = os.path.join(args.save_dir, args.filename)
+        download_attachment(args.message_id, args.attachment_id, args.filename, save_path)
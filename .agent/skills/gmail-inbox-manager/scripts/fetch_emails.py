@@ -1,107 +1,221 @@
 import os.path
-import base64
+import sys
 import json
 import argparse
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from bs4 import BeautifulSoup
-
-# If modifying these scopes, delete the file token.json.
-SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-TOKEN_FILE = os.path.join(BASE_DIR, 'token.json')
-
-def get_service():
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            print("Error: Valid token not found. Please run auth.py first.")
-            return None
-
-    return build('gmail', 'v1', credentials=creds)
-
-def clean_body(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    text = soup.get_text(separator=' ', strip=True)
-    return text
-
-def fetch_emails(limit=5, query="is:unread"):
+from compaction import Compactor
+from gmail_client import get_service
+from gmail_batch import CallStats, DEFAULT_BATCH_SIZE, batch_get_messages, iter_message_pages
+from mailbox_mirror import MailboxMirror
+from message_body import extract_body
+
+# messages().list() returns at most 500 IDs per page.
+MAX_PAGE_SIZE = 500
+
+
+class IncompleteFetch(Exception):
+    """A message could not be fetched; the checkpoint stops just before it."""
+
+def parse_message(msg, include_body=True, compactor=None):
+    payload = msg['payload']
+    headers = payload.get('headers', [])
+
+    subject = ""
+    sender = ""
+    date = ""
+
+    for header in headers:
+        if header['name'] == 'Subject':
+            subject = header['value']
+        if header['name'] == 'From':
+            sender = header['value']
+        if header['name'] == 'Date':
+            date = header['value']
+
+    email = {
+        'id': msg['id'],
+        'date': date,
+        'from': sender,
+        'subject': subject,
+        'snippet': msg.get('snippet', ''),
+    }
+    if not include_body:
+        return email
+
+    if compactor:
+        # Strip quotes, signatures and footers before spending the budget.
+        email['body'] = compactor.compact(extract_body(payload, drop_quotes=True), sender)
+    else:
+        email['body'] = extract_body(payload)[:2000] # Truncate body to avoid hitting token limits downstream
+    return email
+
+def iter_emails(service, limit=5, query="is:unread", include_body=True, batch_size=DEFAULT_BATCH_SIZE,
+                stats=None, page_token=None, offset=0, checkpoint=None, compactor=None):
+    """Yield parsed emails as each batch arrives, following nextPageToken until `limit`.
+
+    Starts at `offset` within the page `page_token` points to. After every
+    batch, `checkpoint(page_token, offset)` receives the position to resume
+    from; `(None, 0)` means the query is exhausted. With a checkpoint, a
+    message that can't be fetched ends the iteration with IncompleteFetch,
+    checkpointed at that message so a resume retries it.
+    """
+    # format=metadata skips the MIME tree entirely when bodies are not needed.
+    fmt = 'full' if include_body else 'metadata'
+    emitted = 0
+    page_size = min(MAX_PAGE_SIZE, limit + offset)
+
+    for page_ids, next_token in iter_message_pages(service, query, page_size, page_token, stats):
+        for start in range(offset, len(page_ids), batch_size):
+            chunk = page_ids[start:start + batch_size][:limit - emitted]
+            # One batch round trip per `batch_size` messages instead of one get() each.
+            messages = batch_get_messages(service, chunk, fmt=fmt, batch_size=batch_size, stats=stats)
+            fetched = {msg['id'] for msg in messages}
+            failed_at = next((i for i, message_id in enumerate(chunk) if message_id not in fetched), None)
+            if checkpoint and failed_at is not None:
+                # Messages come back in `chunk` order, so these are the ones before the failure.
+                for msg in messages[:failed_at]:
+                    yield parse_message(msg, include_body, compactor)
+                checkpoint(page_token, start + failed_at)
+                raise IncompleteFetch(f"could not fetch message {chunk[failed_at]}")
+            for msg in messages:
+                yield parse_message(msg, include_body, compactor)
+            emitted += len(chunk)
+
+            consumed = start + len(chunk)
+            if checkpoint:
+                if consumed < len(page_ids):
+                    checkpoint(page_token, consumed)
+                else:
+                    checkpoint(next_token, 0)
+            if emitted >= limit:
+                return
+
+        page_token = next_token
+        offset = 0
+
+def load_state(state_file):
+    if not state_file or not os.path.exists(state_file):
+        return None
+    with open(state_file) as f:
+        return json.load(f)
+
+def save_state(state_file, state):
+    tmp = state_file + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, state_file)
+
+def fetch_emails(limit=5, query="is:unread", include_body=True, batch_size=DEFAULT_BATCH_SIZE, stats=False,
+                 output_format='json', page_token=None, state_file=None, compactor=None):
     service = get_service()
     if not service:
         return
 
-    try:
-        results = service.users().messages().list(userId='me', q=query, maxResults=limit).execute()
-        messages = results.get('messages', [])
+    call_stats = CallStats()
+    ndjson = output_format == 'ndjson'
+    offset = 0
+    emitted = 0
 
-        email_data = []
-
-        if not messages:
-            print(json.dumps([]))
+    state = load_state(state_file)
+    if state and not page_token:
+        if state.get('query') != query:
+            print(f"Error: {state_file} belongs to query '{state.get('query')}'.", file=sys.stderr)
             return
+        if state.get('done') or state.get('emitted', 0) >= limit:
+            print(f"Export already complete according to {state_file}.", file=sys.stderr)
+            if not state.get('done'):
+                save_state(state_file, dict(state, done=True))
+            return
+        page_token, offset, emitted = state.get('page_token'), state.get('offset', 0), state.get('emitted', 0)
+
+    # The resume position may only move past emails that have been written:
+    # after each batch for ndjson, after the final array for json.
+    position = {}
 
-        for message in messages:
-            msg = service.users().messages().get(userId='me', id=message['id']).execute()
-            
-            payload = msg['payload']
-            headers = payload.get('headers', [])
-            
-            subject = ""
-            sender = ""
-            date = ""
-            
-            for header in headers:
-                if header['name'] == 'Subject':
-                    subject = header['value']
-                if header['name'] == 'From':
-                    sender = header['value']
-                if header['name'] == 'Date':
-                    date = header['value']
-
-            body = ""
-            if 'parts' in payload:
-                for part in payload['parts']:
-                    if part['mimeType'] == 'text/plain':
-                        if 'data' in part['body']:
-                            data = part['body']['data']
-                            body += base64.urlsafe_b64decode(data).decode('utf-8')
-                    elif part['mimeType'] == 'text/html':
-                         # Prefer plain text, but if only HTML exists or it's mixed, you might want logic here.
-                         # For simple summarization, plain text is usually best.
-                         pass
-            elif 'body' in payload and 'data' in payload['body']:
-                data = payload['body']['data']
-                body = base64.urlsafe_b64decode(data).decode('utf-8')
-
-            # If body looks like HTML, clean it
-            if "<html" in body.lower() or "<div" in body.lower():
-                body = clean_body(body)
-
-            email_data.append({
-                'id': message['id'],
-                'date': date,
-                'from': sender,
-                'subject': subject,
-                'snippet': msg.get('snippet', ''),
-                'body': body[:2000] # Truncate body to avoid hitting token limits downstream
-            })
-
-        print(json.dumps(email_data, indent=2))
+    def checkpoint(next_token, next_offset):
+        if state_file:
+            exhausted = next_token is None and next_offset == 0
+            position['state'] = {'query': query, 'page_token': next_token, 'offset': next_offset,
+                                 'emitted': emitted, 'done': exhausted or emitted >= limit}
+            if ndjson:
+                save_state(state_file, position['state'])
+
+    try:
+        email_data = []
+        incomplete = None
+
+        try:
+            # `limit` counts every run of a resumed export, not just this one.
+            for email in iter_emails(service, limit - emitted, query, include_body, batch_size, call_stats,
+                                     page_token, offset, checkpoint, compactor):
+                emitted += 1
+                if ndjson:
+                    # One object per line, flushed so consumers can start immediately.
+                    sys.stdout.write(json.dumps(email) + '\n')
+                    sys.stdout.flush()
+                else:
+                    email_data.append(email)
+        except IncompleteFetch as e:
+            incomplete = e
+
+        if not ndjson:
+            print(json.dumps(email_data, indent=2))
+            if position:
+                save_state(state_file, position['state'])
+
+        if incomplete:
+            print(f"Error: Stopped early, {incomplete}. Re-run with the same --state-file to resume from it.",
+                  file=sys.stderr)
+
+        if stats:
+            report = call_stats.report(emitted)
+            if compactor:
+                report['compaction'] = compactor.report()
+            print(json.dumps(report), file=sys.stderr)
 
     except Exception as e:
-        print(f"An error occurred: {e}")
+        print(f"An error occurred: {e}", file=sys.stderr if ndjson else sys.stdout)
+
+def fetch_emails_cached(limit=5, query="is:unread", include_body=True, output_format='json', compactor=None,
+                        stats=False):
+    mirror = MailboxMirror()
+    try:
+        if not mirror.history_id:
+            print("Error: Local mirror is empty. Run sync_mailbox.py first.")
+            return
+        messages = mirror.query(query, limit)
+        if output_format == 'ndjson':
+            for msg in messages:
+                sys.stdout.write(json.dumps(parse_message(msg, include_body, compactor)) + '\n')
+        else:
+            print(json.dumps([parse_message(msg, include_body, compactor) for msg in messages], indent=2))
+        if stats and compactor:
+            print(json.dumps({'compaction': compactor.report()}), file=sys.stderr)
+    except ValueError as e:
+        print(f"Error: {e}. Drop --cached to run the query against Gmail.")
+    finally:
+        mirror.close()
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Fetch Gmail emails.')
     parser.add_argument('--limit', type=int, default=5, help='Number of emails to fetch')
     parser.add_argument('--query', type=str, default='is:unread', help='Gmail search query')
-    
+    parser.add_argument('--no-body', action='store_true', help='Only fetch headers and snippet (format=metadata)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Messages per batch request (max 100)')
+    parser.add_argument('--stats', action='store_true', help='Print a call-count/latency report to stderr')
+    parser.add_argument('--cached', action='store_true', help='Read from the local mirror (see sync_mailbox.py) instead of Gmail')
+    parser.add_argument('--format', choices=['json', 'ndjson'], default='json', help='json: one array at the end; ndjson: one object per line as messages arrive')
+    parser.add_argument('--page-token', type=str, help='Start from this messages().list() page token')
+    parser.add_argument('--state-file', type=str, help='Save the resume position here after every batch, and resume from it if it exists')
+    parser.add_argument('--max-chars', type=int, default=2000, help='Character budget per body after compaction')
+    parser.add_argument('--max-tokens', type=int, help='Token budget per body (estimated at 4 characters per token)')
+    parser.add_argument('--no-compact', action='store_true', help='Skip compaction and just cut bodies at 2000 characters')
+
     args = parser.parse_args()
-    fetch_emails(limit=args.limit, query=args.query)
+    compactor = None if args.no_compact else Compactor(max_chars=args.max_chars, max_tokens=args.max_tokens)
+    if args.cached:
+        fetch_emails_cached(limit=args.limit, query=args.query, include_body=not args.no_body,
+                            output_format=args.format, compactor=compactor, stats=args.stats)
+    else:
+        fetch_emails(limit=args.limit, query=args.query, include_body=not args.no_body,
+                     batch_size=args.batch_size, stats=args.stats, output_format=args.format,
+                     page_token=args.page_token, state_file=args.state_file, compactor=compactor)
@@ -0,0 +1,119 @@
+import sys
+import json
+import argparse
+from compaction import Compactor, strip_quoted
+from gmail_client import get_service
+from gmail_batch import CallStats, DEFAULT_BATCH_SIZE, METADATA_HEADERS, batch_execute, iter_thread_ids
+from message_body import extract_body
+
+def header_value(payload, name):
+    for header in payload.get('headers', []):
+        if header['name'] == name:
+            return header['value']
+    return ""
+
+def parse_thread(thread, include_body=True, compactor=None):
+    """Aggregate a thread into one object, messages oldest first with quoted history stripped."""
+    messages = []
+    participants = []
+    labels = set()
+
+    for msg in thread.get('messages', []):
+        payload = msg['payload']
+        sender = header_value(payload, 'From')
+        if sender and sender not in participants:
+            participants.append(sender)
+        labels.update(msg.get('labelIds', []))
+
+        entry = {
+            'id': msg['id'],
+            'date': header_value(payload, 'Date'),
+            'from': sender,
+        }
+        if include_body:
+            # Each reply repeats the conversation so far; keep only what it adds.
+            body = extract_body(payload, drop_quotes=True)
+            if compactor:
+                entry['body'] = compactor.compact(body, sender)
+            else:
+                entry['body'] = strip_quoted(body)[:2000] # Truncate body to avoid hitting token limits downstream
+        else:
+            entry['snippet'] = msg.get('snippet', '')
+        messages.append(entry)
+
+    first = thread.get('messages', [{}])[0]
+    return {
+        'id': thread['id'],
+        'subject': header_value(first.get('payload', {}), 'Subject'),
+        'participants': participants,
+        'message_count': len(messages),
+        'first_date': messages[0]['date'] if messages else "",
+        'last_date': messages[-1]['date'] if messages else "",
+        'labels': sorted(labels),
+        'messages': messages,
+    }
+
+def fetch_threads(limit=5, query="is:unread", include_body=True, batch_size=DEFAULT_BATCH_SIZE,
+                  stats=False, output_format='json', compactor=None):
+    service = get_service()
+    if not service:
+        return
+
+    call_stats = CallStats()
+    ndjson = output_format == 'ndjson'
+
+    try:
+        thread_ids = list(iter_thread_ids(service, query, limit, stats=call_stats))
+
+        params = {'userId': 'me', 'format': 'full' if include_body else 'metadata'}
+        if not include_body:
+            params['metadataHeaders'] = METADATA_HEADERS
+
+        threads = service.users().threads()
+        thread_data = []
+        for start in range(0, len(thread_ids), batch_size):
+            chunk = thread_ids[start:start + batch_size]
+            results, errors = batch_execute(service, [(i, threads.get(id=i, **params)) for i in chunk],
+                                            batch_size=batch_size, stats=call_stats)
+            for thread_id, error in errors.items():
+                print(f"Warning: could not fetch thread {thread_id}: {error}", file=sys.stderr)
+
+            for thread_id in chunk:
+                if thread_id not in results:
+                    continue
+                thread = parse_thread(results[thread_id], include_body, compactor)
+                if ndjson:
+                    sys.stdout.write(json.dumps(thread) + '\n')
+                    sys.stdout.flush()
+                else:
+                    thread_data.append(thread)
+
+        if not ndjson:
+            print(json.dumps(thread_data, indent=2))
+
+        if stats:
+            report = call_stats.report(len(thread_ids))
+            if compactor:
+                report['compaction'] = compactor.report()
+            print(json.dumps(report), file=sys.stderr)
+
+    except Exception as e:
+        print(f"An error occurred: {e}", file=sys.stderr if ndjson else sys.stdout)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fetch Gmail conversations, one aggregated object per thread.')
+    parser.add_argument('--limit', type=int, default=5, help='Number of threads to fetch')
+    parser.add_argument('--query', type=str, default='is:unread', help='Gmail search query')
+    parser.add_argument('--no-body', action='store_true', help='Only fetch headers and snippets (format=metadata)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Threads per batch request (max 100)')
+    parser.add_argument('--stats', action='store_true', help='Print a call-count/latency report to stderr')
+    parser.add_argument('--format', choices=['json', 'ndjson'], default='json', help='json: one array at the end; ndjson: one object per line')
+    parser.add_argument('--max-chars', type=int, default=2000, help='Character budget per message body after compaction')
+    parser.add_argument('--max-tokens', type=int, help='Token budget per message body (estimated at 4 characters per token)')
+    parser.add_argument('--no-compact', action='store_true', help='Only strip quoted history and cut bodies at 2000 characters')
+
+    args = parser.parse_args()
+    compactor = None if args.no_compact else Compactor(max_chars=args.max_chars, max_tokens=args.max_tokens)
+    fetch_threads(limit=args.limit, query=args.query, include_body=not args.no_body,
+                  batch_size=args.batch_size, stats=args.stats, output_format=args.format,
+                  compactor=compactor)
@@ -0,0 +1,254 @@
+"""
+Helpers for grouping Gmail API calls into batch HTTP requests.
+
+A batch sends many API calls in one HTTPS round trip. Gmail accepts up to 100
+calls per batch but recommends 50, since larger batches are more likely to be
+rate limited.
+"""
+
+import sys
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from googleapiclient.errors import HttpError
+from gmail_client import authorized_http
+
+DEFAULT_BATCH_SIZE = 50
+MAX_BATCH_SIZE = 100
+MAX_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# batchModify and batchDelete accept at most this many IDs per call.
+MAX_IDS_PER_CALL = 1000
+DEFAULT_WORKERS = 4
+
+# Headers requested when bodies are not needed (format=metadata).
+METADATA_HEADERS = ['Subject', 'From', 'Date']
+
+
+class CallStats:
+    """Counts HTTP round trips so batched and unbatched paths can be compared.
+
+    Safe to share between worker threads.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.single_calls = 0
+        self.batches = 0
+        self.batched_calls = 0
+        self._lock = threading.Lock()
+
+    def record_call(self):
+        with self._lock:
+            self.single_calls += 1
+
+    def record_batch(self, size):
+        with self._lock:
+            self.batches += 1
+            self.batched_calls += size
+
+    def report(self, items):
+        """Summarize the calls made for `items` results."""
+        return {
+            'items': items,
+            'http_round_trips': self.single_calls + self.batches,
+            'unbatched_round_trips': self.single_calls + self.batched_calls,
+            'batches': self.batches,
+            'elapsed_ms': round((time.perf_counter() - self.started) * 1000, 1),
+        }
+
+
+def is_retryable(error):
+    """True for rate-limit and transient server errors."""
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    if status in RETRY_STATUSES:
+        return True
+    return status == 403 and ('rateLimitExceeded' in str(error) or 'userRateLimitExceeded' in str(error))
+
+
+def is_rate_limited(error):
+    """True only for errors that say the request was rejected for rate, so it certainly didn't run."""
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    return status == 429 or (status == 403 and ('rateLimitExceeded' in str(error) or 'userRateLimitExceeded' in str(error)))
+
+
+def backoff(attempt):
+    """Sleep with exponential backoff and jitter before retry `attempt` (0-based)."""
+    time.sleep(min(32, 2 ** attempt) + random.random())
+
+
+def batch_execute(service, requests, batch_size=DEFAULT_BATCH_SIZE, stats=None, http=None):
+    """Execute `(key, HttpRequest)` pairs as Gmail batch requests.
+
+    Returns `(results, errors)`, two dicts keyed by the caller's keys. Calls
+    that fail with a rate-limit or server error are retried with backoff.
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    results = {}
+    errors = {}
+    pending = list(requests)
+
+    for attempt in range(MAX_RETRIES + 1):
+        retry = []
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+
+            def callback(request_id, response, exception, chunk=chunk):
+                key, request = chunk[int(request_id)]
+                if exception is None:
+                    results[key] = response
+                    errors.pop(key, None)
+                elif is_retryable(exception) and attempt < MAX_RETRIES:
+                    retry.append((key, request))
+                else:
+                    errors[key] = exception
+
+            batch = service.new_batch_http_request(callback=callback)
+            for index, (key, request) in enumerate(chunk):
+                batch.add(request, request_id=str(index))
+            batch.execute(http=http)
+            if stats:
+                stats.record_batch(len(chunk))
+
+        if not retry:
+            break
+        backoff(attempt)
+        pending = retry
+
+    return results, errors
+
+
+def iter_message_pages(service, query=None, page_size=500, page_token=None, stats=None):
+    """Yield `(message_ids, next_page_token)` for each page of a messages().list() query."""
+    while True:
+        params = {'userId': 'me', 'maxResults': page_size}
+        if query:
+            params['q'] = query
+        if page_token:
+            params['pageToken'] = page_token
+        results = service.users().messages().list(**params).execute()
+        if stats:
+            stats.record_call()
+        page_token = results.get('nextPageToken')
+        yield [m['id'] for m in results.get('messages', [])], page_token
+        if not page_token:
+            return
+
+
+def iter_message_ids(service, query=None, page_size=500, stats=None):
+    """Yield every message ID matching `query`, following page tokens."""
+    for message_ids, _ in iter_message_pages(service, query, page_size, stats=stats):
+        yield from message_ids
+
+
+def iter_thread_ids(service, query=None, limit=None, page_size=100, stats=None):
+    """Yield thread IDs matching `query`, following page tokens up to `limit`."""
+    if limit is not None and limit <= 0:
+        return
+    page_token = None
+    emitted = 0
+    while True:
+        params = {'userId': 'me', 'maxResults': min(page_size, limit - emitted) if limit is not None else page_size}
+        if query:
+            params['q'] = query
+        if page_token:
+            params['pageToken'] = page_token
+        results = service.users().threads().list(**params).execute()
+        if stats:
+            stats.record_call()
+        for thread in results.get('threads', []):
+            yield thread['id']
+            emitted += 1
+            if limit is not None and emitted >= limit:
+                return
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return
+
+
+def batch_get_messages(service, message_ids, fmt='full', metadata_headers=None,
+                       batch_size=DEFAULT_BATCH_SIZE, stats=None, fields=None):
+    """Fetch messages by ID in batches, returned in the order of `message_ids`.
+
+    `fields` is a partial-response mask limiting what each message carries.
+    """
+    messages = service.users().messages()
+    params = {'userId': 'me', 'format': fmt}
+    if fmt == 'metadata':
+        params['metadataHeaders'] = metadata_headers or METADATA_HEADERS
+    if fields:
+        params['fields'] = fields
+
+    requests = [(msg_id, messages.get(id=msg_id, **params)) for msg_id in message_ids]
+    results, errors = batch_execute(service, requests, batch_size=batch_size, stats=stats)
+
+    for msg_id, error in errors.items():
+        print(f"Warning: could not fetch message {msg_id}: {error}", file=sys.stderr)
+
+    return [results[msg_id] for msg_id in message_ids if msg_id in results]
+
+
+def thread_http(service):
+    """Return an authorized Http for the calling thread.
+
+    httplib2 connections are not thread-safe, so worker threads must not share
+    the service's own Http object. Each thread reuses its connection across calls.
+    """
+    credentials = getattr(service._http, 'credentials', None)
+    if credentials is None:
+        return None
+    return authorized_http(credentials)
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def run_chunks(service, message_ids, make_request, chunk_size=MAX_IDS_PER_CALL, workers=DEFAULT_WORKERS):
+    """Run `make_request(ids)` for each chunk of IDs on a bounded thread pool.
+
+    Returns one report per chunk, in order: `{'chunk', 'count', 'ok', 'error', 'elapsed_ms'}`.
+    """
+    chunks = list(chunked(message_ids, chunk_size))
+
+    def run(index):
+        ids = chunks[index]
+        started = time.perf_counter()
+        error = None
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                make_request(ids).execute(http=thread_http(service))
+                error = None
+                break
+            except HttpError as e:
+                error = e
+                if not is_retryable(e) or attempt == MAX_RETRIES:
+                    break
+                backoff(attempt)
+        return {
+            'chunk': index + 1,
+            'count': len(ids),
+            'ok': error is None,
+            'error': str(error) if error else None,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(run, range(len(chunks))))
+
+
+def collect_message_ids(service, message_ids=None, use_stdin=False, query=None):
+    """Merge IDs from argv, stdin (whitespace separated) and a Gmail query, without duplicates."""
+    ids = list(message_ids or [])
+    if use_stdin:
+        ids.extend(sys.stdin.read().split())
+    if query:
+        ids.extend(iter_message_ids(service, query))
+    return list(dict.fromkeys(ids))
@@ -0,0 +1,121 @@
+"""
+Shared Gmail API client for the skill's scripts.
+
+Credentials are loaded once per process, and a refreshed access token is
+written back to token.json so the next invocation can skip the refresh round
+trip. The service is built from a discovery document cached in the skill
+directory instead of being looked up on every run, and all API calls made on
+one thread share one authorized HTTP connection.
+"""
+
+import os.path
+import json
+import threading
+import httplib2
+import google_auth_httplib2
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build, build_from_document
+
+# If modifying these scopes, delete the file token.json and re-run auth.py.
+SCOPES = ['https://www.googleapis.com/auth/gmail.readonly', 'https://www.googleapis.com/auth/gmail.modify', 'https://www.googleapis.com/auth/gmail.compose', 'https://www.googleapis.com/auth/gmail.send']
+# Only needed to delete messages permanently; granted with `auth.py --full-access`.
+FULL_ACCESS_SCOPE = 'https://mail.google.com/'
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CREDENTIALS_FILE = os.path.join(BASE_DIR, 'credentials.json')
+TOKEN_FILE = os.path.join(BASE_DIR, 'token.json')
+DISCOVERY_FILE = os.path.join(BASE_DIR, 'gmail_discovery.json')
+
+_local = threading.local()
+_service = None
+
+
+def load_credentials():
+    """Load token.json, refreshing and saving it if the access token has expired."""
+    creds = None
+    if os.path.exists(TOKEN_FILE):
+        # The scopes saved in token.json, so a refresh keeps full access if it was granted.
+        creds = Credentials.from_authorized_user_file(TOKEN_FILE)
+
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            # Imported here: the requests transport is slow to import and only needed to refresh.
+            from google.auth.transport.requests import Request
+            creds.refresh(Request())
+            save_credentials(creds)
+        else:
+            print("Error: Valid token not found. Please run auth.py first.")
+            return None
+    return creds
+
+
+def granted_scopes():
+    """Return the scopes token.json was authorized for."""
+    if not os.path.exists(TOKEN_FILE):
+        return set()
+    with open(TOKEN_FILE) as f:
+        scopes = json.load(f).get('scopes') or []
+    return set(scopes.split() if isinstance(scopes, str) else scopes)
+
+
+def save_credentials(creds):
+    tmp_path = TOKEN_FILE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(creds.to_json())
+    os.replace(tmp_path, TOKEN_FILE)
+
+
+def load_discovery_document():
+    """Return the Gmail v1 discovery document, caching it in DISCOVERY_FILE.
+
+    Returns None when no cached or bundled copy exists; build() then fetches it.
+    """
+    if os.path.exists(DISCOVERY_FILE):
+        with open(DISCOVERY_FILE) as f:
+            return f.read()
+
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+    except ImportError:
+        # google-api-python-client < 2.0 does not bundle discovery documents.
+        return None
+    document = get_static_doc('gmail', 'v1')
+    if document:
+        with open(DISCOVERY_FILE, 'w') as f:
+            f.write(document)
+    return document
+
+
+def authorized_http(credentials):
+    """Return the calling thread's authorized Http, creating it on first use.
+
+    httplib2 connections are not thread-safe, so each thread keeps its own
+    connection and reuses it for every call it makes.
+    """
+    http = getattr(_local, 'http', None)
+    if http is None or http.credentials is not credentials:
+        http = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+        _local.http = http
+    return http
+
+
+def build_service(credentials, http=None):
+    document = load_discovery_document()
+    http = http or authorized_http(credentials)
+    if document is None:
+        service = build('gmail', 'v1', http=http, cache_discovery=False)
+        with open(DISCOVERY_FILE, 'w') as f:
+            json.dump(service._rootDesc, f)
+        return service
+    return build_from_document(document, http=http)
+
+
+def get_service():
+    """Return the process-wide Gmail service, or None if not authenticated."""
+    global _service
+    if _service is None:
+        creds = load_credentials()
+        if not creds:
+            return None
+        _service = build_service(creds)
+    return _service
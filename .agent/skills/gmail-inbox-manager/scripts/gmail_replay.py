@@ -0,0 +1,122 @@
+"""
+Record and replay Gmail API HTTP exchanges.
+
+A recording wraps the authorized Http of a live session and keeps the method,
+URI, status, content type and body of every exchange. Credentials never reach
+the cassette: request headers are not stored, and tokens in URIs and response
+bodies are replaced with REDACTED. Replays feed the cassette back through
+googleapiclient's HttpMockSequence, so scripts run unchanged with no network.
+
+Message contents are recorded as returned, so record against a test mailbox.
+"""
+
+import re
+import json
+import threading
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import HttpMockSequence
+import gmail_client
+
+CASSETTE_VERSION = 1
+
+SECRET_PARAMS = re.compile(r'([?&](?:access_token|key|oauth_token)=)[^&]*')
+SECRET_FIELDS = re.compile(r'("(?:access_token|refresh_token|id_token|client_secret)"\s*:\s*)"[^"]*"')
+
+
+def redact_uri(uri):
+    return SECRET_PARAMS.sub(r'\1REDACTED', uri)
+
+
+def redact_body(body):
+    return SECRET_FIELDS.sub(r'\1"REDACTED"', body)
+
+
+class RecordingHttp:
+    """Passes requests to a real Http and records each exchange, redacted.
+
+    Requests are serialized so worker threads record in a well-defined order;
+    the wrapper deliberately has no `credentials`, which keeps gmail_batch from
+    giving worker threads their own, unrecorded connections.
+    """
+
+    def __init__(self, http):
+        self.http = http
+        self.interactions = []
+        self._lock = threading.Lock()
+
+    def request(self, uri, method='GET', body=None, headers=None, redirections=1, connection_type=None):
+        with self._lock:
+            resp, content = self.http.request(uri, method=method, body=body, headers=headers,
+                                              redirections=redirections, connection_type=connection_type)
+            self.interactions.append({
+                'method': method,
+                'uri': redact_uri(uri),
+                'status': resp.status,
+                'content_type': resp.get('content-type', ''),
+                'body': redact_body(content.decode('utf-8', errors='replace')),
+            })
+            return resp, content
+
+
+class ReplayHttp(HttpMockSequence):
+    """HttpMockSequence over recorded interactions that also counts requests.
+
+    Only the method and URI of each request are kept, so request bodies do not
+    inflate memory measurements.
+    """
+
+    def __init__(self, interactions):
+        super().__init__([
+            ({'status': str(i['status']), 'content-type': i['content_type']}, i['body'])
+            for i in interactions
+        ])
+        self._lock = threading.Lock()
+
+    @property
+    def calls(self):
+        return len(self.request_sequence)
+
+    @property
+    def remaining(self):
+        return len(self._iterable)
+
+    def request(self, uri, method='GET', body=None, headers=None, redirections=1, connection_type=None):
+        with self._lock:
+            if not self._iterable:
+                raise RuntimeError(f"Cassette exhausted at request {self.calls + 1}: {method} {uri}")
+            resp, content = super().request(uri, method, body, headers, redirections, connection_type)
+            self.request_sequence[-1] = (uri, method)
+            return resp, content
+
+
+def save_cassette(path, interactions, meta=None):
+    with open(path, 'w') as f:
+        json.dump({'version': CASSETTE_VERSION, 'meta': meta or {}, 'interactions': interactions}, f)
+
+
+def load_cassette(path):
+    with open(path) as f:
+        cassette = json.load(f)
+    if cassette.get('version') != CASSETTE_VERSION:
+        raise ValueError(f"{path}: unsupported cassette version {cassette.get('version')}")
+    return cassette
+
+
+def recording_service():
+    """Return `(service, recorder)` for the live account, or `(None, None)` if not authenticated."""
+    creds = gmail_client.load_credentials()
+    if not creds:
+        return None, None
+    recorder = RecordingHttp(gmail_client.authorized_http(creds))
+    return gmail_client.build_service(creds, http=recorder), recorder
+
+
+def replay_service(interactions):
+    """Return `(service, http)` replaying `interactions` in order."""
+    http = ReplayHttp(interactions)
+    return build_from_document(gmail_client.load_discovery_document(), http=http), http
+
+
+def install(service):
+    """Make gmail_client.get_service() return `service` in this process."""
+    gmail_client._service = service
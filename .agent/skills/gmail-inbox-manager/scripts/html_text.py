@@ -0,0 +1,119 @@
+"""
+Streaming HTML-to-text extraction for email bodies.
+
+Built on the stdlib html.parser event model: text is collected as the parser
+emits it, without building a document tree. Script/style content is skipped,
+block elements become line breaks and runs of whitespace are collapsed.
+"""
+
+import re
+from html.parser import HTMLParser
+
+SKIP_TAGS = {'script', 'style', 'head', 'title', 'noscript', 'template', 'svg'}
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section',
+    'table', 'tr', 'ul',
+}
+CELL_TAGS = {'td', 'th'}
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'source', 'track', 'wbr',
+}
+
+# Containers mail clients wrap quoted replies in (Gmail, Yahoo, Thunderbird, Outlook).
+QUOTE_CLASSES = ('gmail_quote', 'yahoo_quoted', 'moz-cite-prefix')
+QUOTE_IDS = ('divrplyfwdmsg',)
+
+HIDDEN_STYLE = re.compile(
+    r'display\s*:\s*none|visibility\s*:\s*hidden|max-height\s*:\s*0|'
+    r'(?<![-\w])(?:width|height)\s*:\s*[01]px', re.I)
+
+# Zero-width characters marketing mail pads preheaders with.
+INVISIBLE = re.compile('[\u200b\u200c\u200d\u2060\ufeff\u034f\u00ad]')
+SPACES = re.compile(r'[^\S\n]+')
+
+
+class HTMLTextExtractor(HTMLParser):
+    """Collects the visible text of an HTML document as it is parsed."""
+
+    def __init__(self, drop_quotes=False, drop_tracking=True):
+        super().__init__(convert_charrefs=True)
+        self.drop_quotes = drop_quotes
+        self.drop_tracking = drop_tracking
+        self._chunks = []
+        # Open elements as (tag, skipped) so unclosed tags can be unwound.
+        self._stack = []
+
+    @property
+    def _skipping(self):
+        return bool(self._stack) and self._stack[-1][1]
+
+    def _should_skip(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            return True
+        attrs = dict(attrs)
+        if self.drop_quotes:
+            if tag == 'blockquote':
+                return True
+            classes = (attrs.get('class') or '').lower()
+            if any(name in classes for name in QUOTE_CLASSES):
+                return True
+            if (attrs.get('id') or '').lower() in QUOTE_IDS:
+                return True
+        if self.drop_tracking:
+            # Hidden preheaders and 0/1px tracking pixels.
+            if HIDDEN_STYLE.search(attrs.get('style') or ''):
+                return True
+            if attrs.get('width') in ('0', '1') or attrs.get('height') in ('0', '1'):
+                return True
+        return False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            # Many mails never close <head>; don't let it swallow the body.
+            self.handle_endtag('head')
+        skipped = self._skipping or self._should_skip(tag, attrs)
+        if not skipped:
+            if tag in BLOCK_TAGS:
+                self._chunks.append('\n')
+            elif tag in CELL_TAGS:
+                self._chunks.append(' ')
+        if tag not in VOID_TAGS:
+            self._stack.append((tag, skipped))
+
+    def handle_startendtag(self, tag, attrs):
+        if not self._skipping and tag in BLOCK_TAGS:
+            self._chunks.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS or not any(open_tag == tag for open_tag, _ in self._stack):
+            return
+        while self._stack:
+            open_tag, skipped = self._stack.pop()
+            if open_tag == tag:
+                break
+        if not skipped and tag in BLOCK_TAGS:
+            self._chunks.append('\n')
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self._chunks.append(data)
+
+    def text(self):
+        raw = INVISIBLE.sub('', ''.join(self._chunks))
+        lines = (SPACES.sub(' ', line).strip() for line in raw.split('\n'))
+        return '\n'.join(line for line in lines if line)
+
+
+def html_to_text(html, drop_quotes=False, drop_tracking=True):
+    """Return the visible text of `html`, one line per block element.
+
+    drop_quotes skips quoted-reply containers (blockquote, gmail_quote, ...).
+    drop_tracking skips hidden elements such as preheaders and tracking pixels.
+    """
+    parser = HTMLTextExtractor(drop_quotes=drop_quotes, drop_tracking=drop_tracking)
+    parser.feed(html)
+    parser.close()
+    return parser.text()
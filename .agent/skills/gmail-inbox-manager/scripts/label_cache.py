@@ -0,0 +1,91 @@
+"""
+On-disk cache of Gmail label names to label IDs.
+
+Scripts that take label names resolve them here instead of calling
+labels().list() for every message. The cache expires after a TTL and is
+refreshed once per process when a name is not found, so newly created
+labels resolve without waiting for the TTL.
+"""
+
+import os.path
+import json
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LABEL_CACHE_FILE = os.path.join(BASE_DIR, 'labels_cache.json')
+DEFAULT_TTL = 3600
+
+
+def _keys(label):
+    # Gmail search writes spaces and slashes in label names as hyphens (label:my-label).
+    name = label['name'].lower()
+    return {name, name.replace(' ', '-').replace('/', '-'), label['id'].lower()}
+
+
+class LabelIndex:
+    """Case-insensitive label name/ID -> label ID lookups backed by a JSON file."""
+
+    def __init__(self, service=None, path=None, ttl=DEFAULT_TTL):
+        self.service = service
+        self.path = path or LABEL_CACHE_FILE
+        self.ttl = ttl
+        self.refreshed = False
+        self._ids = {}
+        self._names = {}
+        self._fetched_at = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._index(data.get('labels', []))
+        self._fetched_at = data.get('fetched_at', 0)
+
+    def _index(self, labels):
+        self._ids = {}
+        self._names = {label['id']: label['name'] for label in labels}
+        for label in labels:
+            for key in _keys(label):
+                self._ids.setdefault(key, label['id'])
+
+    @property
+    def expired(self):
+        return time.time() - self._fetched_at > self.ttl
+
+    def refresh(self):
+        """Fetch the label list once and rewrite the cache file."""
+        result = self.service.users().labels().list(userId='me').execute()
+        labels = [{'id': l['id'], 'name': l['name']} for l in result.get('labels', [])]
+        self._index(labels)
+        self._fetched_at = time.time()
+        self.refreshed = True
+        # Replace the file in one step so a concurrent reader never sees it half-written.
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'fetched_at': self._fetched_at, 'labels': labels}, f)
+        os.replace(tmp_path, self.path)
+
+    def resolve(self, name):
+        """Return the label ID for a name or ID, or None if it doesn't exist.
+
+        Without a service the cached labels are used even when expired.
+        """
+        if self.service and not self.refreshed and (self.expired or not self._ids):
+            self.refresh()
+        label_id = self._ids.get(name.lower())
+        if label_id is None and self.service and not self.refreshed:
+            # Miss on a cached index: the label may be new or renamed.
+            self.refresh()
+            label_id = self._ids.get(name.lower())
+        return label_id
+
+    def name(self, label_id):
+        """Return the display name for a label ID, or the ID itself if unknown."""
+        if label_id not in self._names and self.service and not self.refreshed:
+            self.refresh()
+        return self._names.get(label_id, label_id)
@@ -0,0 +1,358 @@
+"""
+Local SQLite mirror of the Gmail mailbox.
+
+The first sync downloads every message once. Later syncs replay only the
+changes since the stored historyId via users.history.list, and fall back to a
+full resync when Gmail no longer has history that old (HTTP 404). Messages
+that could not be fetched (quota or server errors) are remembered and
+fetched again by the next sync.
+"""
+
+import os.path
+import sys
+import json
+import shlex
+import sqlite3
+from googleapiclient.errors import HttpError
+from gmail_batch import CallStats, DEFAULT_BATCH_SIZE, batch_execute, iter_message_ids
+from label_cache import LabelIndex
+from message_body import extract_body
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIRROR_FILE = os.path.join(BASE_DIR, 'mirror.db')
+
+# IDs are written to the mirror in chunks of this size during a full sync.
+SYNC_CHUNK = 500
+
+# Stored in state as 'fts_version' once every message is in messages_fts;
+# bump it when the index's columns or tokenizer change to force a rebuild.
+FTS_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    thread_id TEXT,
+    history_id INTEGER,
+    internal_date INTEGER,
+    label_ids TEXT,
+    sender TEXT,
+    subject TEXT,
+    snippet TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_internal_date ON messages (internal_date);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+    subject, sender, date, body,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Local equivalents for the Gmail search operators the mirror can answer.
+IS_LABELS = {'unread': 'UNREAD', 'starred': 'STARRED', 'important': 'IMPORTANT'}
+IN_LABELS = {'inbox': 'INBOX', 'sent': 'SENT', 'trash': 'TRASH', 'spam': 'SPAM',
+             'drafts': 'DRAFT', 'chats': 'CHAT'}
+
+
+def _header(msg, name):
+    for header in msg.get('payload', {}).get('headers', []):
+        if header['name'].lower() == name.lower():
+            return header['value']
+    return ""
+
+
+def _fts_row(rowid, msg):
+    return (rowid, _header(msg, 'Subject'), _header(msg, 'From'), _header(msg, 'Date'),
+            extract_body(msg.get('payload', {})))
+
+
+def _labels_column(label_ids):
+    # Space-delimited on both sides so a label can be matched with LIKE '% ID %'.
+    return f" {' '.join(label_ids)} " if label_ids else " "
+
+
+class MailboxMirror:
+    """SQLite-backed copy of the mailbox, kept current with history deltas."""
+
+    def __init__(self, path=MIRROR_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def get_state(self, key):
+        row = self.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, str(value)))
+
+    @property
+    def history_id(self):
+        return self.get_state('history_id')
+
+    @property
+    def retry_ids(self):
+        """IDs of messages a previous sync failed to fetch."""
+        return set(json.loads(self.get_state('retry_ids') or '[]'))
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def upsert_messages(self, messages):
+        """Store messages and (re)index their text. Call inside a transaction."""
+        for msg in messages:
+            # ON CONFLICT keeps the rowid stable, which is also the messages_fts rowid.
+            self.conn.execute(
+                "INSERT INTO messages "
+                "(id, thread_id, history_id, internal_date, label_ids, sender, subject, snippet, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET thread_id = excluded.thread_id, "
+                "history_id = excluded.history_id, internal_date = excluded.internal_date, "
+                "label_ids = excluded.label_ids, sender = excluded.sender, "
+                "subject = excluded.subject, snippet = excluded.snippet, data = excluded.data",
+                (msg['id'], msg.get('threadId'), int(msg.get('historyId', 0)),
+                 int(msg.get('internalDate', 0)), _labels_column(msg.get('labelIds', [])),
+                 _header(msg, 'From'), _header(msg, 'Subject'), msg.get('snippet', ''),
+                 json.dumps(msg)))
+            rowid = self.conn.execute("SELECT rowid FROM messages WHERE id = ?", (msg['id'],)).fetchone()[0]
+            self.conn.execute("DELETE FROM messages_fts WHERE rowid = ?", (rowid,))
+            self.conn.execute("INSERT INTO messages_fts (rowid, subject, sender, date, body) "
+                              "VALUES (?, ?, ?, ?, ?)", _fts_row(rowid, msg))
+
+    def delete_messages(self, message_ids):
+        for message_id in message_ids:
+            row = self.conn.execute("SELECT rowid FROM messages WHERE id = ?", (message_id,)).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM messages_fts WHERE rowid = ?", row)
+                self.conn.execute("DELETE FROM messages WHERE rowid = ?", row)
+
+    def reindex(self):
+        """Rebuild the full-text index from the stored messages."""
+        with self.conn:
+            self.conn.execute("DELETE FROM messages_fts")
+            rows = self.conn.execute("SELECT rowid, data FROM messages")
+            self.conn.executemany(
+                "INSERT INTO messages_fts (rowid, subject, sender, date, body) VALUES (?, ?, ?, ?, ?)",
+                (_fts_row(rowid, json.loads(data)) for rowid, data in rows))
+            self.conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('optimize')")
+            self.set_state('fts_version', FTS_VERSION)
+
+    def is_indexed(self):
+        """False when messages were mirrored before the current full-text index existed."""
+        return self.get_state('fts_version') == str(FTS_VERSION)
+
+    def search(self, match, limit=10):
+        """Rank messages against an FTS5 MATCH expression, best first."""
+        sql = """
+            SELECT m.id, f.date, f.sender, f.subject,
+                   snippet(messages_fts, 3, '[', ']', '...', 16), f.rank
+            FROM messages_fts AS f JOIN messages AS m ON m.rowid = f.rowid
+            WHERE messages_fts MATCH ?
+            ORDER BY f.rank
+            LIMIT ?
+        """
+        return [{'id': row[0], 'date': row[1], 'from': row[2], 'subject': row[3],
+                 'snippet': row[4], 'rank': round(row[5], 3)}
+                for row in self.conn.execute(sql, (match, limit))]
+
+    def update_labels(self, message_id, label_ids):
+        row = self.conn.execute("SELECT data FROM messages WHERE id = ?", (message_id,)).fetchone()
+        if not row:
+            return
+        msg = json.loads(row[0])
+        msg['labelIds'] = label_ids
+        self.conn.execute("UPDATE messages SET label_ids = ?, data = ? WHERE id = ?",
+                          (_labels_column(label_ids), json.dumps(msg), message_id))
+
+    def get_message(self, message_id):
+        """Return the stored `format=full` message resource, or None."""
+        row = self.conn.execute("SELECT data FROM messages WHERE id = ?", (message_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, query="", limit=None):
+        """Return stored messages matching a Gmail-style query, newest first.
+
+        Supports is:, in:, label: (name or ID), from: and subject: operators (optionally
+        negated with '-') and bare words matched against sender, subject and
+        snippet. Raises ValueError for anything else.
+        """
+        clauses = []
+        params = []
+        labels = None
+        for token in shlex.split(query or ""):
+            negate = token.startswith('-')
+            if negate:
+                token = token[1:]
+            op, _, value = token.partition(':') if ':' in token else ('', '', token)
+            op = op.lower()
+
+            if op == 'is' and value.lower() == 'read':
+                clause, arg = "label_ids NOT LIKE ?", "% UNREAD %"
+            elif op == 'is' and value.lower() in IS_LABELS:
+                clause, arg = "label_ids LIKE ?", f"% {IS_LABELS[value.lower()]} %"
+            elif op == 'in' and value.lower() in IN_LABELS:
+                clause, arg = "label_ids LIKE ?", f"% {IN_LABELS[value.lower()]} %"
+            elif op == 'label':
+                # User labels are stored by ID; names resolve through the cached label index.
+                labels = labels or LabelIndex()
+                clause, arg = "label_ids LIKE ?", f"% {labels.resolve(value) or value} %"
+            elif op == 'from':
+                clause, arg = "sender LIKE ?", f"%{value}%"
+            elif op == 'subject':
+                clause, arg = "subject LIKE ?", f"%{value}%"
+            elif not op:
+                clause, arg = "(sender LIKE ? OR subject LIKE ? OR snippet LIKE ?)", f"%{value}%"
+            else:
+                raise ValueError(f"Search operator '{op}:' is not supported offline")
+
+            params.extend([arg] * clause.count('?'))
+            clauses.append(f"NOT {clause}" if negate else clause)
+
+        sql = "SELECT data FROM messages"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY internal_date DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [json.loads(row[0]) for row in self.conn.execute(sql, params)]
+
+    def sync(self, service, full=False, query=None, batch_size=DEFAULT_BATCH_SIZE):
+        """Bring the mirror up to date. Returns a summary dict."""
+        stats = CallStats()
+        query = query or self.get_state('query')
+        if full or not self.history_id:
+            summary = self.full_sync(service, query, batch_size, stats)
+        else:
+            try:
+                summary = self.incremental_sync(service, batch_size, stats)
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+                # startHistoryId is older than Gmail keeps history for.
+                summary = self.full_sync(service, query, batch_size, stats)
+                summary['reason'] = 'history expired'
+
+        summary.update(stats.report(self.count()))
+        return summary
+
+    def full_sync(self, service, query=None, batch_size=DEFAULT_BATCH_SIZE, stats=None):
+        """Download every message (matching `query`) and record the current historyId.
+
+        When `query` is set only matching messages are mirrored initially, but
+        later incremental syncs add every new message.
+        """
+        # Read the historyId first so changes made during the download are replayed later.
+        profile = service.users().getProfile(userId='me').execute()
+        if stats:
+            stats.record_call()
+
+        with self.conn:
+            self.conn.execute("DELETE FROM messages")
+            self.conn.execute("DELETE FROM messages_fts")
+            self.conn.execute("DELETE FROM state")
+
+        added = 0
+        failed = set()
+        chunk = []
+        for message_id in iter_message_ids(service, query, stats=stats):
+            chunk.append(message_id)
+            if len(chunk) >= SYNC_CHUNK:
+                added += self._fetch_and_store(service, chunk, batch_size, stats, failed)
+                chunk = []
+        if chunk:
+            added += self._fetch_and_store(service, chunk, batch_size, stats, failed)
+
+        with self.conn:
+            self.set_state('history_id', profile['historyId'])
+            self.set_state('retry_ids', json.dumps(sorted(failed)))
+            # Every message stored above was indexed as it was stored.
+            self.set_state('fts_version', FTS_VERSION)
+            if query:
+                self.set_state('query', query)
+
+        return {'mode': 'full', 'added': added, 'deleted': 0, 'labels_updated': 0,
+                'retry_pending': len(failed), 'history_id': profile['historyId']}
+
+    def incremental_sync(self, service, batch_size=DEFAULT_BATCH_SIZE, stats=None):
+        """Apply history records since the stored historyId."""
+        added = set()
+        deleted = set()
+        relabelled = set()
+        history_id = self.history_id
+        page_token = None
+
+        while True:
+            params = {'userId': 'me', 'startHistoryId': self.history_id}
+            if page_token:
+                params['pageToken'] = page_token
+            results = service.users().history().list(**params).execute()
+            if stats:
+                stats.record_call()
+
+            for record in results.get('history', []):
+                for item in record.get('messagesAdded', []):
+                    message_id = item['message']['id']
+                    added.add(message_id)
+                    deleted.discard(message_id)
+                for item in record.get('messagesDeleted', []):
+                    message_id = item['message']['id']
+                    deleted.add(message_id)
+                    added.discard(message_id)
+                    relabelled.discard(message_id)
+                for item in record.get('labelsAdded', []) + record.get('labelsRemoved', []):
+                    message_id = item['message']['id']
+                    if message_id not in deleted:
+                        relabelled.add(message_id)
+
+            history_id = results.get('historyId', history_id)
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+        # Messages an earlier sync couldn't fetch are fetched again with the new ones.
+        added |= self.retry_ids - deleted
+        relabelled -= added
+        failed = set()
+        stored = self._fetch_and_store(service, sorted(added), batch_size, stats, failed)
+
+        # format=minimal returns labelIds without the payload.
+        messages = service.users().messages()
+        requests = [(i, messages.get(userId='me', id=i, format='minimal')) for i in sorted(relabelled)]
+        results, errors = batch_execute(service, requests, batch_size=batch_size, stats=stats)
+        with self.conn:
+            for message_id, msg in results.items():
+                self.update_labels(message_id, msg.get('labelIds', []))
+            gone = [i for i, e in errors.items() if isinstance(e, HttpError) and e.resp.status == 404]
+            # A relabelled message that couldn't be re-read is fetched in full next time.
+            failed.update(i for i in errors if i not in gone)
+            self.delete_messages(sorted(deleted) + gone)
+            self.set_state('history_id', history_id)
+            self.set_state('retry_ids', json.dumps(sorted(failed)))
+
+        return {'mode': 'incremental', 'added': stored, 'deleted': len(deleted) + len(gone),
+                'labels_updated': len(results), 'retry_pending': len(failed), 'history_id': history_id}
+
+    def _fetch_and_store(self, service, message_ids, batch_size, stats, failed):
+        """Fetch and store messages; IDs that failed with anything but 404 are added to `failed`."""
+        messages = service.users().messages()
+        requests = [(i, messages.get(userId='me', id=i, format='full')) for i in message_ids]
+        results, errors = batch_execute(service, requests, batch_size=batch_size, stats=stats)
+        gone = []
+        for message_id, error in errors.items():
+            if isinstance(error, HttpError) and error.resp.status == 404:
+                # Deleted between listing and fetching.
+                gone.append(message_id)
+            else:
+                failed.add(message_id)
+                print(f"Warning: could not fetch message {message_id}, will retry on the next sync: {error}",
+                      file=sys.stderr)
+        with self.conn:
+            self.upsert_messages(results.values())
+            self.delete_messages(gone)
+        return len(results)
@@ -0,0 +1,27 @@
+"""
+Shared helpers for turning Gmail message payloads into plain text.
+"""
+
+from html_text import html_to_text
+from mime_walker import find_body
+
+
+def clean_body(html_content, drop_quotes=False):
+    if html_content is None:
+        return ""
+    return html_to_text(html_content, drop_quotes=drop_quotes)
+
+
+def extract_body(payload, drop_quotes=False):
+    """Return the untruncated text body of a `format=full` payload.
+
+    Plain text is preferred; HTML is only decoded and cleaned when a message
+    has no plain-text part. drop_quotes skips quoted-reply blocks in HTML.
+    """
+    body, mime_type = find_body(payload)
+
+    # HTML parts, and plain parts that are really HTML, get cleaned
+    if mime_type == 'text/html' or "<html" in body.lower() or "<div" in body.lower():
+        body = clean_body(body, drop_quotes=drop_quotes)
+
+    return body
@@ -0,0 +1,75 @@
+"""
+Lazy traversal of Gmail `format=full` payloads.
+
+Gmail returns the MIME tree as nested `parts`. Bodies often sit several
+levels down (multipart/mixed > multipart/related > multipart/alternative),
+so every lookup here walks the whole tree. Parts are yielded one at a time
+and nothing is decoded until a caller asks for that part's text.
+"""
+
+import base64
+
+
+def walk_parts(payload):
+    """Yield every part of the tree depth-first, in document order."""
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        yield part
+        stack.extend(reversed(part.get('parts', [])))
+
+
+def _header(part, name):
+    for header in part.get('headers', []):
+        if header['name'].lower() == name:
+            return header['value']
+    return ""
+
+
+def is_attachment(part):
+    if part.get('filename'):
+        return True
+    return _header(part, 'content-disposition').lower().startswith('attachment')
+
+
+def iter_text_parts(payload, mime_type):
+    """Yield inline (non-attachment) parts of `mime_type` that carry body data."""
+    for part in walk_parts(payload):
+        if part.get('mimeType') == mime_type and 'data' in part.get('body', {}) and not is_attachment(part):
+            yield part
+
+
+def decode_part(part):
+    """Decode a part's base64url body data to text."""
+    return base64.urlsafe_b64decode(part['body']['data']).decode('utf-8', errors='replace')
+
+
+def find_body(payload):
+    """Return `(text, mime_type)` for the message body, decoding as little as possible.
+
+    All inline text/plain parts are decoded and joined. Only when there are
+    none is the first text/html part decoded; it is returned as raw HTML.
+    """
+    plain = [decode_part(part) for part in iter_text_parts(payload, 'text/plain')]
+    if plain:
+        return "".join(plain), 'text/plain'
+    for part in iter_text_parts(payload, 'text/html'):
+        return decode_part(part), 'text/html'
+    return "", None
+
+
+def iter_attachment_parts(payload):
+    """Yield attachment parts without reading their data."""
+    for part in walk_parts(payload):
+        if is_attachment(part) and part.get('filename'):
+            yield part
+
+
+def list_attachments(payload):
+    """Describe every attachment in the tree."""
+    return [{
+        'filename': part['filename'],
+        'mimeType': part['mimeType'],
+        'attachmentId': part['body'].get('attachmentId'),
+        'size': part['body'].get('size', 0)
+    } for part in iter_attachment_parts(payload)]
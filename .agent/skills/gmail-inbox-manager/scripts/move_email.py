@@ -1,74 +1,78 @@
 import argparse
-import os.path
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from gmail_client import get_service
+from gmail_batch import DEFAULT_WORKERS, collect_message_ids, run_chunks
+from label_cache import LabelIndex
 
-SCOPES = ['https://www.googleapis.com/auth/gmail.modify']
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-TOKEN_FILE = os.path.join(BASE_DIR, 'token.json')
-
-def get_service():
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            print("Error: Valid token not found.")
-            return None
-
-    return build('gmail', 'v1', credentials=creds)
-
-def move_email(message_id, add_labels, remove_labels):
+def move_email(message_ids, add_labels, remove_labels, use_stdin=False, query=None, workers=DEFAULT_WORKERS):
     service = get_service()
     if not service: return
 
+    if isinstance(message_ids, str):
+        message_ids = [message_ids]
+
     try:
-        body = {
-            'addLabelIds': add_labels,
-            'removeLabelIds': remove_labels
-        }
+        message_ids = collect_message_ids(service, message_ids, use_stdin, query)
+        if not message_ids:
+            print("No message IDs provided.")
+            return
+
         # We need the ACTUAL Label IDs, not names, or we use the names if they are system labels
-        # For custom labels, we need to find the ID first.
-        
-        # Get all labels to find IDs for names
-        labels_result = service.users().labels().list(userId='me').execute()
-        labels = labels_result.get('labels', [])
-        
+        # For custom labels, we need to find the ID first (cached on disk by LabelIndex).
+        labels = LabelIndex(service)
+
         final_add = []
         for label_name in add_labels:
-            matched = [l['id'] for l in labels if l['name'].lower() == label_name.lower() or l['id'].lower() == label_name.lower()]
-            if matched:
-                final_add.append(matched[0])
+            label_id = labels.resolve(label_name)
+            if label_id:
+                final_add.append(label_id)
             else:
                 print(f"Warning: Label '{label_name}' not found.")
 
         final_remove = []
         for label_name in remove_labels:
-            matched = [l['id'] for l in labels if l['name'].lower() == label_name.lower() or l['id'].lower() == label_name.lower()]
-            if matched:
-                final_remove.append(matched[0])
+            label_id = labels.resolve(label_name)
+            if label_id:
+                final_remove.append(label_id)
 
         body = {
             'addLabelIds': final_add,
             'removeLabelIds': final_remove
         }
-        
-        service.users().messages().modify(userId='me', id=message_id, body=body).execute()
-        print(f"Successfully modified labels for message {message_id}")
+
+        # batchModify applies the same change to up to 1000 messages per call.
+        messages = service.users().messages()
+        reports = run_chunks(service, message_ids,
+                             lambda ids: messages.batchModify(userId='me', body=dict(body, ids=ids)),
+                             workers=workers)
+
+        if len(message_ids) == 1 and reports[0]['ok']:
+            print(f"Successfully modified labels for message {message_ids[0]}")
+            return
+
+        for report in reports:
+            if report['ok']:
+                print(f"Chunk {report['chunk']}/{len(reports)}: modified {report['count']} messages ({report['elapsed_ms']} ms)")
+            else:
+                print(f"Chunk {report['chunk']}/{len(reports)}: failed for {report['count']} messages: {report['error']}")
+
+        succeeded = sum(r['count'] for r in reports if r['ok'])
+        failed = len(message_ids) - succeeded
+        print(f"Successfully modified labels for {succeeded} of {len(message_ids)} messages" + (f" ({failed} failed)" if failed else ""))
 
     except Exception as e:
         print(f"An error occurred: {e}")
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument('message_id')
+    parser.add_argument('message_ids', nargs='*')
     parser.add_argument('--add', nargs='+')
     parser.add_argument('--remove', nargs='+')
+    parser.add_argument('--stdin', action='store_true', help='Also read whitespace-separated message IDs from stdin')
+    parser.add_argument('--query', type=str, help='Also modify every message matching this Gmail query')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Chunks of 1000 IDs to process concurrently')
     
     args = parser.parse_args()
-    move_email(args.message_id, args.add or [], args.remove or [])
+    if not (args.message_ids or args.stdin or args.query):
+        parser.error('provide message IDs, --stdin or --query')
+    move_email(args.message_ids, args.add or [], args.remove or [],
+               use_stdin=args.stdin, query=args.query, workers=args.workers)
@@ -0,0 +1,57 @@
+import argparse
+import json
+import time
+from mailbox_mirror import MailboxMirror
+
+def to_match_expression(query):
+    """Quote each search term so punctuation in it isn't read as FTS5 syntax.
+
+    A trailing '*' is kept as a prefix search, e.g. invoic* matches invoice/invoices.
+    """
+    terms = []
+    for term in query.split():
+        prefix = term.endswith('*')
+        term = term.rstrip('*').replace('"', '""')
+        if term:
+            terms.append(f'"{term}"*' if prefix else f'"{term}"')
+    return " ".join(terms)
+
+def search_local(query, limit=10, raw=False, rebuild=False):
+    mirror = MailboxMirror()
+    try:
+        if not mirror.history_id:
+            print("Error: Local mirror is empty. Run sync_mailbox.py first.")
+            return
+        if rebuild or not mirror.is_indexed():
+            mirror.reindex()
+
+        match = query if raw else to_match_expression(query)
+        if not match:
+            print("Error: Empty search query.")
+            return
+
+        started = time.perf_counter()
+        results = mirror.search(match, limit)
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        print(json.dumps({
+            'query': query,
+            'count': len(results),
+            'elapsed_ms': elapsed_ms,
+            'results': results
+        }, indent=2))
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        mirror.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Full-text search over the local Gmail mirror.')
+    parser.add_argument('query', help='Words to search for (all must match; end a word with * for prefix search)')
+    parser.add_argument('--limit', type=int, default=10, help='Maximum number of results')
+    parser.add_argument('--raw', action='store_true', help='Pass the query through as FTS5 syntax (OR, NEAR, subject:word, ...)')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the index from the mirror before searching')
+
+    args = parser.parse_args()
+    search_local(args.query, limit=args.limit, raw=args.raw, rebuild=args.rebuild)
@@ -1,29 +1,20 @@
 import argparse
 import os.path
 import base64
+import csv
+import json
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.message import EmailMessage
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from gmail_client import get_service
+from gmail_batch import MAX_RETRIES, backoff, is_rate_limited
 
-SCOPES = ['https://www.googleapis.com/auth/gmail.send', 'https://www.googleapis.com/auth/gmail.compose']
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-TOKEN_FILE = os.path.join(BASE_DIR, 'token.json')
-
-def get_service():
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            print("Error: Valid token not found.")
-            return None
-
-    return build('gmail', 'v1', credentials=creds)
+# messages.send costs 100 of the 250 quota units a user gets per second, so
+# Gmail allows at most 2.5 sends/second; stay a little under that.
+DEFAULT_SEND_RATE = 2.0
+SEND_RETRIES = MAX_RETRIES + 2
 
 def send_draft(draft_id):
     service = get_service()
@@ -56,20 +47,187 @@ def send_direct(to, subject, body, thread_id=None):
     except Exception as e:
         print(f"An error occurred while sending the message: {e}")
 
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                time.sleep((1 - self.tokens) / self.rate)
+
+def load_recipients(path):
+    """Read recipient rows from a CSV (with a header row) or a JSON list of objects or addresses."""
+    with open(path, newline='') as f:
+        if path.lower().endswith('.json'):
+            data = json.load(f)
+            rows = data.get('recipients', []) if isinstance(data, dict) else data
+        else:
+            rows = list(csv.DictReader(f))
+    # A bare address is a row with only the recipient filled in.
+    rows = [{'to': row} if isinstance(row, str) else row for row in rows]
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise ValueError(f"recipient {i + 1} in {path} is not an object or an address")
+        row.setdefault('email', row.get('to', ''))
+    return rows
+
+def load_journal(journal_path):
+    """Return {email: status} for recipients in the journal: 'sent', or 'failed' if delivery is unknown."""
+    statuses = {}
+    if os.path.exists(journal_path):
+        with open(journal_path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    email = entry['email'].lower()
+                    if statuses.get(email) != 'sent':
+                        statuses[email] = entry.get('status', 'sent')
+    return statuses
+
+def render_message(subject_template, body_template, row):
+    """Render one personalized message. Placeholders use $name / ${name} syntax."""
+    message = EmailMessage()
+    message.set_content(string.Template(body_template).substitute(row))
+    message['To'] = row['email']
+    message['Subject'] = string.Template(subject_template).substitute(row)
+    return {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()}
+
+def send_with_retry(service, body):
+    """Send one message, retrying only rate-limit rejections.
+
+    messages.send is not idempotent: after a server error or a timeout the
+    message may have gone out anyway, so those are not retried.
+    """
+    for attempt in range(SEND_RETRIES + 1):
+        try:
+            return service.users().messages().send(userId='me', body=body).execute()
+        except Exception as e:
+            if not is_rate_limited(e) or attempt == SEND_RETRIES:
+                raise
+            backoff(attempt)
+
+def send_bulk(recipients_file, subject_template, template_file, journal_path=None,
+              rate=DEFAULT_SEND_RATE, workers=4, dry_run=False, retry_failed=False):
+    with open(template_file) as f:
+        body_template = f.read()
+    try:
+        rows = load_recipients(recipients_file)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    journal_path = journal_path or recipients_file + '.journal.jsonl'
+    journaled = load_journal(journal_path)
+    skip = {'sent'} if retry_failed else {'sent', 'failed'}
+
+    pending = []
+    seen = set()
+    duplicates = 0
+    for row in rows:
+        email = (row['email'] or '').lower()
+        if not email or journaled.get(email) in skip:
+            continue
+        if email in seen:
+            duplicates += 1
+            continue
+        seen.add(email)
+        pending.append(row)
+    unknown = sum(1 for status in journaled.values() if status == 'failed')
+
+    print(f"{len(rows)} recipients, {len(rows) - len(pending) - duplicates} already in {journal_path}"
+          + (f", {duplicates} duplicate rows skipped" if duplicates else ""))
+    if unknown and not retry_failed:
+        print(f"{unknown} earlier sends failed and may have been delivered; check Sent mail, then rerun with --retry-failed to send them again")
+
+    def render(row):
+        try:
+            return row, render_message(subject_template, body_template, row), None
+        except (KeyError, ValueError) as e:
+            return row, None, f"template error: missing or invalid placeholder {e}"
+
+    if dry_run:
+        for row, body, error in map(render, pending[:1]):
+            print(error or base64.urlsafe_b64decode(body['raw']).decode())
+        return
+
+    service = get_service()
+    if not service: return
+
+    limiter = TokenBucket(rate)
+    sent = 0
+    failed = 0
+
+    # Rendering happens on the pool ahead of the (rate-limited) sends.
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool, open(journal_path, 'a') as journal:
+        for row, body, error in pool.map(render, pending):
+            entry = None
+            if error is None:
+                limiter.acquire()
+                try:
+                    sent_message = send_with_retry(service, body)
+                    entry = {'email': row['email'], 'status': 'sent', 'message_id': sent_message['id']}
+                except Exception as e:
+                    error = str(e)
+                    if not is_rate_limited(e):
+                        # May have been delivered: recorded so a plain rerun doesn't send it twice.
+                        entry = {'email': row['email'], 'status': 'failed', 'error': error}
+
+            if entry:
+                entry['sent_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+                journal.write(json.dumps(entry) + '\n')
+                journal.flush()
+                os.fsync(journal.fileno())
+
+            if error:
+                failed += 1
+                print(f"Failed to send to {row['email']}: {error}")
+                continue
+
+            sent += 1
+            print(f"Sent to {row['email']}. Message ID: {sent_message['id']}")
+
+    print(f"Bulk send complete: {sent} sent, {failed} failed, {len(rows) - len(pending)} skipped")
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument('--draft_id')
     group.add_argument('--to')
+    group.add_argument('--recipients', help='CSV or JSON recipient list for a mail merge (needs --subject and --template)')
     
     parser.add_argument('--subject')
     parser.add_argument('--body')
     parser.add_argument('--thread_id')
+    parser.add_argument('--template', help='Body template file for --recipients; $column placeholders are filled per recipient')
+    parser.add_argument('--journal', help='Journal of sent recipients (default: <recipients>.journal.jsonl); reruns skip them')
+    parser.add_argument('--rate', type=float, default=DEFAULT_SEND_RATE, help='Maximum sends per second')
+    parser.add_argument('--workers', type=int, default=4, help='Threads rendering messages ahead of sending')
+    parser.add_argument('--dry-run', action='store_true', help='Render the first pending message and exit without sending')
+    parser.add_argument('--retry-failed', action='store_true', help='Also send to recipients whose earlier send failed with an unknown outcome')
     
     args = parser.parse_args()
     
     if args.draft_id:
         send_draft(args.draft_id)
+    elif args.recipients:
+        if not args.subject or not args.template:
+            print("Error: Subject and template are required for bulk sending.")
+        else:
+            send_bulk(args.recipients, args.subject, args.template, journal_path=args.journal,
+                      rate=args.rate, workers=args.workers, dry_run=args.dry_run,
+                      retry_failed=args.retry_failed)
     else:
         if not args.subject or not args.body:
             print("Error: Subject and body are required for direct sending.")
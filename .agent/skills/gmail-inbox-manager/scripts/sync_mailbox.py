@@ -0,0 +1,28 @@
+import argparse
+import json
+from gmail_client import get_service
+from gmail_batch import DEFAULT_BATCH_SIZE
+from mailbox_mirror import MailboxMirror
+
+def sync_mailbox(full=False, query=None, batch_size=DEFAULT_BATCH_SIZE):
+    service = get_service()
+    if not service:
+        return
+
+    mirror = MailboxMirror()
+    try:
+        summary = mirror.sync(service, full=full, query=query, batch_size=batch_size)
+        print(json.dumps(summary, indent=2))
+    except Exception as e:
+        print(f"An error occurred during sync: {e}")
+    finally:
+        mirror.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sync the local Gmail mirror used by --cached reads.')
+    parser.add_argument('--full', action='store_true', help='Discard the mirror and download everything again')
+    parser.add_argument('--query', type=str, help='Only mirror messages matching this Gmail query on a full sync (e.g. "newer_than:1y")')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Messages per batch request (max 100)')
+
+    args = parser.parse_args()
+    sync_mailbox(full=args.full, query=args.query, batch_size=args.batch_size)
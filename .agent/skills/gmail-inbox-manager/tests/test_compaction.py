@@ -0,0 +1,86 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from compaction import FooterTracker, strip_disclaimers, strip_signature
+
+
+class StripSignatureTest(unittest.TestCase):
+
+    def test_valediction_mid_message_keeps_following_text(self):
+        text = 'Hi team,\n\nThanks.\nThe deploy is moved to Friday 9am.\nPlease confirm.'
+        self.assertEqual(strip_signature(text), text)
+
+    def test_bare_delimiter_mid_message_keeps_following_text(self):
+        text = 'Results:\n--\nrow1\nrow2'
+        self.assertEqual(strip_signature(text), text)
+
+    def test_valediction_drops_name_block(self):
+        text = 'See you Friday.\n\nBest regards,\nJane Doe\nSenior Engineer, Acme Inc.\n+1 555 010 0100'
+        self.assertEqual(strip_signature(text), 'See you Friday.\n\nBest regards,')
+
+    def test_delimiter_drops_contact_block(self):
+        text = 'See you Friday.\n-- \nJane Doe\njane@example.com'
+        self.assertEqual(strip_signature(text), 'See you Friday.')
+
+    def test_mobile_signature(self):
+        self.assertEqual(strip_signature('On my way.\n\nSent from my iPhone'), 'On my way.')
+
+
+class StripDisclaimersTest(unittest.TestCase):
+
+    def test_single_keyword_paragraph_is_kept(self):
+        text = 'To unsubscribe the old address, use the privacy policy form.'
+        self.assertEqual(strip_disclaimers(text), text)
+
+    def test_single_signal_trailing_paragraph_is_kept(self):
+        text = 'Hi,\n\nPlease read the updated privacy policy before Monday.'
+        self.assertEqual(strip_disclaimers(text), text)
+
+    def test_trailing_boilerplate_is_dropped(self):
+        text = ('Your order has shipped.\n\n'
+                'You are receiving this because you signed up. Unsubscribe | Privacy policy')
+        self.assertEqual(strip_disclaimers(text), 'Your order has shipped.')
+
+    def test_boilerplate_before_content_is_kept(self):
+        text = ('Hi,\n\nYou are receiving this because you signed up. Unsubscribe here.\n\n'
+                'Your order has shipped.')
+        self.assertEqual(strip_disclaimers(text), text)
+
+
+class FooterTrackerTest(unittest.TestCase):
+
+    FOOTER = 'Acme Corp, 1 Main Street, Springfield. Update your notification settings any time.'
+
+    def test_repeated_footer_from_same_sender_is_dropped(self):
+        footers = FooterTracker()
+        first = 'Your order 1001 has shipped.\n\n' + self.FOOTER
+        second = 'Your order 1002 has shipped.\n\n' + self.FOOTER
+        self.assertEqual(footers.strip(first, 'Acme <shop@acme.com>'), first)
+        self.assertEqual(footers.strip(second, 'shop@acme.com'), 'Your order 1002 has shipped.')
+
+    def test_same_footer_from_another_sender_is_kept(self):
+        footers = FooterTracker()
+        footers.strip('Order 1001 shipped.\n\n' + self.FOOTER, 'shop@acme.com')
+        other = 'Invoice 77 is ready.\n\n' + self.FOOTER
+        self.assertEqual(footers.strip(other, 'billing@example.com'), other)
+
+    def test_repeated_body_text_survives(self):
+        footers = FooterTracker()
+        alert = ('ALERT: disk usage on db-1 is above 90 percent.\n\n'
+                 'The nightly backup job will fail if this is not resolved before 02:00.')
+        self.assertEqual(footers.strip(alert, 'alerts@example.com'), alert)
+        self.assertEqual(footers.strip(alert, 'alerts@example.com'), alert)
+
+    def test_repeated_paragraph_before_new_content_survives(self):
+        footers = FooterTracker()
+        notice = 'Scheduled maintenance runs every Sunday between 01:00 and 03:00 UTC.'
+        footers.strip('Status update.\n\n' + notice, 'ops@example.com')
+        follow_up = notice + '\n\nThis week it moves to Saturday.'
+        self.assertEqual(footers.strip(follow_up, 'ops@example.com'), follow_up)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,30 @@
 #!/usr/bin/env python3
 """
 Create multiple tasks from a JSON file.
+
+Tasks may nest children under "subtasks" (task objects or plain title
+strings). Each level of the tree is created with batched API requests once
+the level above it exists.
+
+Created tasks are recorded in a journal as each batch completes, keyed by the
+task's "key" field or else a hash of its content, so rerunning an
+interrupted import skips what was already created.
 """
 
+import os
 import sys
 import json
+import hashlib
 import argparse
+from collections import Counter
 from pathlib import Path
 
 # Add scripts directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from google_tasks_api import GoogleTasksAPI, format_task, print_json, parse_date
+from google_tasks_api import (GoogleTasksAPI, DEFAULT_BATCH_SIZE, DEFAULT_WORKERS,
+                              format_task, print_json, parse_date)
+from task_cache import TaskCache, DEFAULT_MAX_AGE
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Batch create tasks from JSON file")
@@ -27,6 +40,46 @@ def parse_args():
         help="Default task list ID if not specified in task (uses '@default' if not specified)"
     )
     
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Tasks per batch request (default: {DEFAULT_BATCH_SIZE}). Google may apply a batch "
+             "out of order, so siblings can be misordered; see --keep-order"
+    )
+    
+    parser.add_argument(
+        "--keep-order",
+        action="store_true",
+        help="Place each task after its previous sibling so the file order is kept for certain; "
+             "takes one round per sibling position instead of one per level"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Batch requests in flight at once (default: {DEFAULT_WORKERS})"
+    )
+    
+    parser.add_argument(
+        "--journal",
+        help="Journal of created tasks (default: <input-file>.journal.jsonl); reruns skip them"
+    )
+    
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Compare the file with the journal and the existing tasks without creating anything"
+    )
+    
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=DEFAULT_MAX_AGE,
+        help=f"With --dry-run, seconds before the local task cache is re-synced (default: {DEFAULT_MAX_AGE})"
+    )
+    
     return parser.parse_args()
 
 def prepare_task(task_spec: dict) -> dict:
@@ -45,15 +98,121 @@ def prepare_task(task_spec: dict) -> dict:
         if due_date:
             task_data["due"] = due_date
     
-    # Parent (for subtasks)
+    # Parent (an existing task ID, for subtasks of tasks created earlier)
     if "parent" in task_spec:
         task_data["parent"] = task_spec["parent"]
     
     return task_data
 
+def flatten_tasks(task_specs: list, parent_key=None, nodes=None) -> list:
+    """Flatten nested "subtasks" into create_task_tree() nodes, in file order."""
+    nodes = [] if nodes is None else nodes
+    for task_spec in task_specs:
+        if isinstance(task_spec, str):
+            task_spec = {"title": task_spec}
+        key = len(nodes)
+        nodes.append({
+            "key": key,
+            "parent_key": parent_key,
+            "list_id": task_spec.get("list_id"),
+            "spec": {k: v for k, v in task_spec.items() if k != "subtasks"},
+            "task": prepare_task(task_spec),
+        })
+        flatten_tasks(task_spec.get("subtasks", []), key, nodes)
+    return nodes
+
+def assign_dedupe_keys(nodes: list):
+    """Give every node a "dedupe_key" that is stable across runs of the same file.
+    
+    An explicit "key" in the task spec is used as is. Otherwise the key is a
+    hash of the task's list, spec as written in the file and parent's key;
+    repeats of an identical task get a numbered suffix. The spec is hashed
+    rather than the prepared task, whose due date depends on the day a
+    relative date like "Friday" is resolved.
+    """
+    used = set()
+    repeats = Counter()
+    by_key = {}
+    for node in nodes:
+        explicit = node["spec"].get("key")
+        if explicit is not None:
+            dedupe_key = str(explicit)
+            if dedupe_key in used:
+                raise ValueError(f"Duplicate key '{dedupe_key}'")
+        else:
+            parent = by_key[node["parent_key"]]["dedupe_key"] if node["parent_key"] is not None else None
+            content = json.dumps([node["list_id"], parent, node["spec"]], sort_keys=True, default=str)
+            digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+            repeats[digest] += 1
+            dedupe_key = digest if repeats[digest] == 1 else f"{digest}-{repeats[digest]}"
+        used.add(dedupe_key)
+        node["dedupe_key"] = dedupe_key
+        by_key[node["key"]] = node
+
+def load_journal(journal_path: str) -> dict:
+    """Return the tasks already created, by dedupe key."""
+    created = {}
+    if os.path.exists(journal_path):
+        with open(journal_path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    created[entry["key"]] = entry
+    return created
+
+def dry_run(nodes: list, journal: dict, default_list_id: str, max_age: float) -> int:
+    """Report what an import would do, against the journal and one cached listing per list."""
+    by_key = {node["key"]: node for node in nodes}
+    cache = TaskCache(GoogleTasksAPI)
+    listings = {}
+    
+    def existing(list_id):
+        # (parent title, title, due date) of every task in the list, read once
+        if list_id not in listings:
+            tasklist_id = cache.ensure_fresh(list_id, max_age=max_age)
+            tasks = list(cache.iter_tasks(tasklist_id))
+            titles = {task["id"]: task.get("title") for task in tasks}
+            listings[list_id] = {
+                (titles.get(task.get("parent")), task.get("title"), (task.get("due") or "")[:10])
+                for task in tasks
+            }
+        return listings[list_id]
+    
+    plan = []
+    try:
+        for node in nodes:
+            parent = by_key.get(node["parent_key"])
+            list_id = parent["list_id"] if parent else (node["list_id"] or default_list_id)
+            node["list_id"] = list_id
+            if node["dedupe_key"] in journal:
+                action = "journaled"
+            else:
+                match = (parent["task"]["title"] if parent else None, node["task"]["title"],
+                         node["task"].get("due", "")[:10])
+                action = "exists" if match in existing(list_id) else "create"
+            plan.append({"index": node["key"], "key": node["dedupe_key"], "title": node["task"]["title"],
+                         "list_id": list_id, "action": action})
+    except Exception as e:
+        print(f"Error: Failed to fetch existing tasks: {e}", file=sys.stderr)
+        return 1
+    finally:
+        cache.close()
+    
+    actions = Counter(item["action"] for item in plan)
+    print_json({
+        "success": True,
+        "dry_run": True,
+        "total": len(plan),
+        "to_create": actions["create"],
+        "already_imported": actions["journaled"],
+        "already_in_list": actions["exists"],
+        "tasks": plan
+    })
+    
+    return 0
+
 def main():
     args = parse_args()
-    api = GoogleTasksAPI()
     
     # Use default list if not specified
     default_list_id = args.list_id or '@default'
@@ -75,43 +234,76 @@ def main():
         print("Error: Input file must contain an array of tasks or an object with 'tasks' key", file=sys.stderr)
         return 1
     
-    # Create tasks
-    results = []
-    errors = []
-    
-    for i, task_spec in enumerate(tasks_to_create):
-        try:
-            # Get list ID for this task
-            tasklist_id = task_spec.get("list_id", default_list_id)
-            
-            task_data = prepare_task(task_spec)
-            result = api.create_task(tasklist_id, task_data)
-            
+    try:
+        nodes = flatten_tasks(tasks_to_create)
+        assign_dedupe_keys(nodes)
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Error: Invalid task specification: {e}", file=sys.stderr)
+        return 1
+    
+    journal_path = args.journal or args.input_file + ".journal.jsonl"
+    try:
+        journaled = load_journal(journal_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error reading journal {journal_path}: {e}", file=sys.stderr)
+        return 1
+    
+    if args.dry_run:
+        return dry_run(nodes, journaled, default_list_id, args.max_age)
+    
+    # Tasks created by an earlier run are not created again; their subtasks
+    # are created under the existing tasks
+    existing = {}
+    for node in nodes:
+        entry = journaled.get(node["dedupe_key"])
+        if entry:
+            existing[node["key"]] = {"id": entry["id"], "title": entry.get("title")}
+            node["list_id"] = entry["list_id"]
+    
+    total = len(nodes)
+    if existing:
+        print(f"{len(existing)} of {total} tasks already created according to {journal_path}", file=sys.stderr)
+    
+    api = GoogleTasksAPI()
+    
+    with open(journal_path, "a") as journal:
+        def report(node, result, error):
+            i = node["key"]
             if result:
-                results.append(format_task(result))
-                print(f"✓ Created task {i+1}/{len(tasks_to_create)}: {task_spec['title']}", file=sys.stderr)
+                journal.write(json.dumps({"key": node["dedupe_key"], "id": result["id"],
+                                          "list_id": node["list_id"], "title": result.get("title")}) + "\n")
+                print(f"✓ Created task {i+1}/{total}: {node['spec']['title']}", file=sys.stderr)
             else:
-                errors.append({
-                    "index": i,
-                    "task": task_spec,
-                    "error": "API returned None"
-                })
-                print(f"✗ Failed to create task {i+1}: {task_spec['title']}", file=sys.stderr)
+                print(f"✗ Error creating task {i+1}: {error}", file=sys.stderr)
+        
+        def flush():
+            journal.flush()
+            os.fsync(journal.fileno())
         
-        except Exception as e:
-            errors.append({
-                "index": i,
-                "task": task_spec,
-                "error": str(e)
-            })
-            print(f"✗ Error creating task {i+1}: {e}", file=sys.stderr)
+        # Create tasks, one batched round per level of the tree
+        created, failures = api.create_task_tree(default_list_id, nodes, batch_size=args.batch_size,
+                                                 workers=args.workers, on_result=report, on_batch=flush,
+                                                 existing=existing, keep_order=args.keep_order)
+    
+    results = [format_task(created[node["key"]]) for node in nodes
+               if node["key"] in created and node["key"] not in existing]
+    errors = [
+        {
+            "index": node["key"],
+            "task": node["spec"],
+            "error": failures[node["key"]]
+        }
+        for node in nodes if node["key"] in failures
+    ]
     
     # Print summary
     print_json({
         "success": len(errors) == 0,
         "created": len(results),
+        "skipped": len(existing),
         "failed": len(errors),
-        "total": len(tasks_to_create),
+        "total": total,
+        "journal": journal_path,
         "tasks": results,
         "errors": errors
     })
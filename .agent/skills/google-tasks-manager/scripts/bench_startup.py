@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start latency of the Google Tasks scripts.
+
+Every variant runs in a fresh interpreter, as the scripts do when the agent
+calls them. No API requests are made: "first call" stops once the service
+is built and a date has been parsed.
+"""
+
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).parent
+
+SCRIPTS = [
+    "batch_create",
+    "complete_task",
+    "create_task",
+    "export_to_markdown",
+    "get_task",
+    "list_task_lists",
+    "query_tasks",
+    "update_task",
+]
+
+# Without a token.json both first-call variants use the same placeholder credentials.
+CREDENTIALS = '''
+from google.oauth2.credentials import Credentials
+import google_tasks_api
+creds = None
+if google_tasks_api.TOKEN_FILE.exists():
+    creds = Credentials.from_authorized_user_file(str(google_tasks_api.TOKEN_FILE), google_tasks_api.SCOPES)
+if not creds or not creds.valid:
+    creds = Credentials(token='bench')
+'''
+
+FIRST_CALL = {
+    "interpreter": "pass",
+    # What GoogleTasksAPI() and parse_date() did before startup was optimized:
+    # import the whole client stack, build() from discovery, parse with dateutil.
+    "build": CREDENTIALS + '''
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build
+from dateutil import parser as date_parser
+build('tasks', 'v1', credentials=creds)
+date_parser.parse('2026-01-20').strftime('%Y-%m-%dT%H:%M:%S.000Z')
+''',
+    "google_tasks_api": CREDENTIALS + '''
+api = google_tasks_api.GoogleTasksAPI()
+api.creds = creds
+api.service
+google_tasks_api.parse_date('2026-01-20')
+''',
+}
+
+def time_command(command, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=SCRIPTS_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 1),
+        "min_ms": round(min(timings), 1)
+    }
+
+def bench_startup(runs: int = 10) -> dict:
+    commands = {f"import/{name}": [sys.executable, "-c", f"import {name}"] for name in SCRIPTS}
+    commands.update({f"first_call/{name}": [sys.executable, "-c", code] for name, code in FIRST_CALL.items()})
+
+    # Warm the discovery cache and the OS file cache before timing
+    for command in commands.values():
+        time_command(command, 1)
+
+    results = {}
+    for key, command in commands.items():
+        results[key] = time_command(command, runs)
+        print(f"{key}: {results[key]}", file=sys.stderr)
+
+    results["first_call_saved_ms"] = round(
+        results["first_call/build"]["median_ms"] - results["first_call/google_tasks_api"]["median_ms"], 1)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-invocation startup time of the Google Tasks scripts")
+
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=10,
+        help="Fresh interpreters started per variant (default: 10)"
+    )
+
+    args = parser.parse_args()
+    print(json.dumps(bench_startup(args.runs), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,55 +1,187 @@
 #!/usr/bin/env python3
 """
 Mark a task as complete in Google Tasks.
+
+With --where, completes every open task in the list matching all of the
+given conditions, using batched patch requests.
 """
 
+import re
 import sys
 import argparse
+from datetime import datetime, timedelta
 from pathlib import Path
 
 # Add scripts directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from google_tasks_api import GoogleTasksAPI, format_task, print_json
+from google_tasks_api import (GoogleTasksAPI, DEFAULT_BATCH_SIZE, DEFAULT_WORKERS,
+                              format_task, parse_date, print_json)
+
+# field<op>value, e.g. "due<2026-02-01", "title~invoice"
+CONDITION = re.compile(r'^\s*(due|updated|title|notes)\s*(<=|>=|<|>|~)\s*(.+?)\s*$')
+DATE_FIELDS = {"due", "updated"}
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Mark a task as complete")
-    
-    parser.add_argument(
+
+    target = parser.add_mutually_exclusive_group(required=True)
+
+    target.add_argument(
         "--task-id",
-        required=True,
         help="Task ID to complete"
     )
-    
+
+    target.add_argument(
+        "--where",
+        action="append",
+        metavar="CONDITION",
+        help="Complete every open task matching this condition; repeat to combine. "
+             "Dates: due<DATE, due<=DATE, due>DATE, due>=DATE, updated<DATE (...). "
+             "Text: title~word, notes~word (case-insensitive)"
+    )
+
     parser.add_argument(
         "--list-id",
         help="Task list ID (uses default list '@default' if not specified)"
     )
-    
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="With --where, list the matching tasks without completing them"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Batch requests in flight at once (default: {DEFAULT_WORKERS})"
+    )
+
     return parser.parse_args()
 
+def parse_condition(expression: str):
+    """Parse "field<op>value" into (field, op, value); dates become RFC 3339."""
+    match = CONDITION.match(expression)
+    if not match:
+        raise ValueError(f"Invalid condition '{expression}'")
+    field, op, value = match.groups()
+    if field in DATE_FIELDS:
+        if op == "~":
+            raise ValueError(f"'{field}' needs a date comparison (<, <=, >, >=)")
+        value = parse_date(value)
+        if value is None:
+            raise ValueError(f"Invalid date in '{expression}'")
+    elif op != "~":
+        raise ValueError(f"'{field}' only supports '~' (contains)")
+    return field, op, value
+
+def server_filters(conditions) -> dict:
+    """iter_tasks() arguments that narrow the listing before matches are checked locally."""
+    filters = {}
+    for field, op, value in conditions:
+        if field == "due" and op == "<":
+            filters["due_max"] = value
+        elif field == "due" and op == "<=":
+            # dueMax is exclusive; a day later keeps tasks due on the date itself
+            day_after = datetime.strptime(value[:10], "%Y-%m-%d") + timedelta(days=1)
+            filters["due_max"] = day_after.strftime("%Y-%m-%dT00:00:00.000Z")
+        elif field == "due" and op in (">", ">="):
+            filters["due_min"] = value
+        elif field == "updated" and op in (">", ">="):
+            filters["updated_min"] = value
+    return filters
+
+def matches(task: dict, conditions) -> bool:
+    for field, op, value in conditions:
+        actual = task.get(field)
+        if op == "~":
+            if value.lower() not in (actual or "").lower():
+                return False
+            continue
+        # RFC 3339 timestamps in the same format compare correctly as strings
+        if actual is None:
+            return False
+        if not {"<": actual < value, "<=": actual <= value,
+                ">": actual > value, ">=": actual >= value}[op]:
+            return False
+    return True
+
+def complete_where(api, tasklist_id: str, expressions, dry_run: bool, workers: int) -> int:
+    try:
+        conditions = [parse_condition(e) for e in expressions]
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        tasks = api.iter_tasks(tasklist_id, show_completed=False, **server_filters(conditions))
+        matched = [task for task in tasks if matches(task, conditions)]
+    except Exception as e:
+        print(f"Error: Failed to fetch tasks: {e}", file=sys.stderr)
+        return 1
+
+    if dry_run:
+        print_json({
+            "success": True,
+            "dry_run": True,
+            "matched": len(matched),
+            "tasks": [format_task(t) for t in matched]
+        })
+        return 0
+
+    requests = [(t["id"], api.patch_request(tasklist_id, t["id"], {"status": "completed"})) for t in matched]
+    results, failures = api.batch_execute(requests, batch_size=DEFAULT_BATCH_SIZE, workers=workers)
+
+    errors = [
+        {
+            "task_id": t["id"],
+            "title": t.get("title"),
+            "error": str(failures.get(t["id"], "No response"))
+        }
+        for t in matched if t["id"] not in results
+    ]
+    for error in errors:
+        print(f"✗ Failed to complete task: {error['title']}: {error['error']}", file=sys.stderr)
+    print(f"✓ Completed {len(results)} of {len(matched)} matching tasks", file=sys.stderr)
+
+    print_json({
+        "success": len(errors) == 0,
+        "matched": len(matched),
+        "completed": len(results),
+        "failed": len(errors),
+        "tasks": [format_task(results[t["id"]]) for t in matched if t["id"] in results],
+        "errors": errors
+    })
+
+    return 0 if not errors else 1
+
 def main():
     args = parse_args()
     api = GoogleTasksAPI()
-    
+
     # Use default list if not specified
     tasklist_id = args.list_id or '@default'
-    
+
+    if args.where:
+        return complete_where(api, tasklist_id, args.where, args.dry_run, args.workers)
+
     # Complete the task
     result = api.complete_task(tasklist_id, args.task_id)
-    
+
     if result is None:
         print("Error: Failed to complete task", file=sys.stderr)
         return 1
-    
+
     formatted_task = format_task(result)
-    
+
     print_json({
         "success": True,
         "task": formatted_task,
         "message": "Task marked as complete"
     })
-    
+
     return 0
 
 if __name__ == "__main__":
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Create a checklist of nested tasks from a JSON or YAML template.
+
+A template has the same "tasks" tree as batch_create.py input, plus optional
+"variables" (defaults for $name placeholders, overridden with --var) and
+"list_title" (used with --new-list). The tree is created level by level,
+each level as parallel batch requests.
+"""
+
+import sys
+import json
+import string
+import argparse
+from pathlib import Path
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from google_tasks_api import (GoogleTasksAPI, DEFAULT_BATCH_SIZE, DEFAULT_WORKERS,
+                              format_task, print_json)
+from batch_create import flatten_tasks
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Create a checklist from a template")
+    
+    parser.add_argument(
+        "--template",
+        required=True,
+        help="Template file (.json, .yaml or .yml), or the name of one in the skill's templates folder"
+    )
+    
+    parser.add_argument(
+        "--var",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Value for a $NAME placeholder; repeat for several"
+    )
+    
+    target = parser.add_mutually_exclusive_group()
+    
+    target.add_argument(
+        "--list-id",
+        help="Task list ID (uses default list '@default' if not specified)"
+    )
+    
+    target.add_argument(
+        "--new-list",
+        action="store_true",
+        help="Create a new task list, titled by the template's list_title"
+    )
+    
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the rendered checklist without creating anything"
+    )
+    
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Tasks per batch request (default: {DEFAULT_BATCH_SIZE}). Google may apply a batch "
+             "out of order, so siblings can be misordered; see --keep-order"
+    )
+    
+    parser.add_argument(
+        "--keep-order",
+        action="store_true",
+        help="Place each task after its previous sibling so the file order is kept for certain; "
+             "takes one round per sibling position instead of one per level"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Batch requests in flight at once (default: {DEFAULT_WORKERS})"
+    )
+    
+    return parser.parse_args()
+
+def find_template(name: str) -> Path:
+    """Resolve a template path, falling back to the templates folder."""
+    path = Path(name)
+    if path.exists():
+        return path
+    for suffix in ("", ".json", ".yaml", ".yml"):
+        candidate = TEMPLATES_DIR / f"{name}{suffix}"
+        if candidate.exists():
+            return candidate
+    raise FileNotFoundError(f"Template not found: {name}")
+
+def load_template(path: Path) -> dict:
+    """Read a JSON or YAML template. YAML needs PyYAML."""
+    text = Path(path).read_text(encoding="utf-8")
+    if Path(path).suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML templates need PyYAML (pip install pyyaml); or use a JSON template")
+        try:
+            template = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML in {path}: {e}")
+    else:
+        template = json.loads(text)
+    
+    if isinstance(template, list):
+        template = {"tasks": template}
+    if not isinstance(template, dict) or not isinstance(template.get("tasks"), list):
+        raise ValueError("Template must contain a 'tasks' array")
+    return template
+
+def parse_vars(assignments) -> dict:
+    variables = {}
+    for assignment in assignments:
+        name, sep, value = assignment.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"Invalid --var '{assignment}' (expected NAME=VALUE)")
+        variables[name.strip()] = value
+    return variables
+
+def render(value, variables: dict):
+    """Substitute $name / ${name} placeholders in every string of a template tree."""
+    if isinstance(value, str):
+        return string.Template(value).substitute(variables)
+    if isinstance(value, list):
+        return [render(item, variables) for item in value]
+    if isinstance(value, dict):
+        return {key: render(item, variables) for key, item in value.items()}
+    return value
+
+def create_checklist(template: dict, variables: dict = None, list_id: str = None, new_list: bool = False,
+                     dry_run: bool = False, batch_size: int = DEFAULT_BATCH_SIZE,
+                     workers: int = DEFAULT_WORKERS, keep_order: bool = False) -> int:
+    """Render a template and create its tasks. Returns the exit status."""
+    values = {str(name): str(value) for name, value in (template.get("variables") or {}).items()}
+    values.update(variables or {})
+    try:
+        tasks = render(template["tasks"], values)
+        list_title = render(template.get("list_title") or "Checklist", values)
+    except KeyError as e:
+        print(f"Error: No value for placeholder {e}; pass --var {e.args[0]}=VALUE", file=sys.stderr)
+        return 1
+    except ValueError as e:
+        print(f"Error: Invalid placeholder in template: {e}", file=sys.stderr)
+        return 1
+    
+    try:
+        nodes = flatten_tasks(tasks)
+    except (KeyError, TypeError) as e:
+        print(f"Error: Invalid task specification: {e}", file=sys.stderr)
+        return 1
+    
+    if dry_run:
+        print_json({
+            "success": True,
+            "dry_run": True,
+            "list_title": list_title if new_list else None,
+            "task_count": len(nodes),
+            "tasks": tasks
+        })
+        return 0
+    
+    api = GoogleTasksAPI()
+    
+    if new_list:
+        task_list = api.create_task_list(list_title)
+        if not task_list:
+            return 1
+        list_id = task_list["id"]
+        print(f"✅ Created task list: {task_list['title']}", file=sys.stderr)
+    list_id = list_id or '@default'
+    
+    total = len(nodes)
+    
+    def report(node, result, error):
+        indent = "  " * node["depth"]
+        if result:
+            print(f"{indent}✅ {node['task']['title']}", file=sys.stderr)
+        else:
+            print(f"{indent}❌ Failed: {node['task']['title']}: {error}", file=sys.stderr)
+    
+    for node in nodes:
+        node["depth"] = 0 if node["parent_key"] is None else nodes[node["parent_key"]]["depth"] + 1
+    
+    # The root level first, then each level below it as parallel batches
+    created, failures = api.create_task_tree(list_id, nodes, batch_size=batch_size,
+                                             workers=workers, on_result=report, keep_order=keep_order)
+    
+    errors = [
+        {
+            "index": node["key"],
+            "title": node["task"]["title"],
+            "error": failures[node["key"]]
+        }
+        for node in nodes if node["key"] in failures
+    ]
+    roots = [format_task(created[node["key"]]) for node in nodes
+             if node["parent_key"] is None and node["key"] in created]
+    
+    print_json({
+        "success": len(errors) == 0,
+        "list_id": list_id,
+        "list_title": list_title if new_list else None,
+        "created": len(created),
+        "failed": len(errors),
+        "total": total,
+        "tasks": roots,
+        "errors": errors
+    })
+    
+    return 0 if not errors else 1
+
+def main():
+    args = parse_args()
+    
+    try:
+        template = load_template(find_template(args.template))
+        variables = parse_vars(args.var)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    
+    return create_checklist(template, variables, list_id=args.list_id, new_list=args.new_list,
+                            dry_run=args.dry_run, batch_size=args.batch_size, workers=args.workers,
+                            keep_order=args.keep_order)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,57 @@
 #!/usr/bin/env python3
 """
 Export Google Tasks to Markdown format for Obsidian.
+
+Subtasks are nested under their parent task. With --output-dir, several
+lists are exported at once, one file per list, and a manifest in the
+directory records each list's `updated` time so unchanged lists are skipped
+on the next run.
 """
 
+import os
+import re
 import sys
+import json
 import argparse
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
 
 # Add scripts directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from google_tasks_api import GoogleTasksAPI, format_task
+from google_tasks_api import GoogleTasksAPI, format_task, status_filters
+from task_cache import TaskCache, DEFAULT_MAX_AGE
+
+MANIFEST_FILE = ".tasks_export.json"
+
+GROUPS = [
+    ("overdue", "## ⚠️ Overdue"),
+    ("today", "## 📅 Due Today"),
+    ("upcoming", "## 📆 Upcoming"),
+    ("no_due", "## 📋 No Due Date"),
+]
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Export tasks to Markdown")
     
     parser.add_argument(
         "--list-id",
-        help="Task list ID (uses default list '@default' if not specified)"
+        action="append",
+        help="Task list ID (uses default list '@default' if not specified). "
+             "With --output-dir, repeat to export several lists (default: every list)"
     )
     
-    parser.add_argument(
+    output = parser.add_mutually_exclusive_group(required=True)
+    
+    output.add_argument(
         "--output-file",
-        required=True,
-        help="Output markdown file path"
+        help="Output markdown file path (one list)"
+    )
+    
+    output.add_argument(
+        "--output-dir",
+        help="Write one markdown file per list into this directory, skipping lists unchanged since the last export"
     )
     
     parser.add_argument(
@@ -34,6 +61,31 @@ def parse_args():
         help="Filter by status (default: needsAction)"
     )
     
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="With --output-dir, re-export every list even if unchanged"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="With --output-dir, task lists fetched at once (default: one per list, up to 10)"
+    )
+    
+    parser.add_argument(
+        "--cached",
+        action="store_true",
+        help="Export from the local task cache, syncing only changes when it is stale"
+    )
+    
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=DEFAULT_MAX_AGE,
+        help=f"With --cached, seconds before the cache is re-synced (default: {DEFAULT_MAX_AGE}; 0 always syncs)"
+    )
+    
     return parser.parse_args()
 
 def format_task_markdown(task: dict, indent: int = 0) -> str:
@@ -70,135 +122,291 @@ def format_task_markdown(task: dict, indent: int = 0) -> str:
     
     return "\n".join(lines)
 
-def main():
-    args = parse_args()
-    api = GoogleTasksAPI()
-    
-    # Use default list if not specified
-    tasklist_id = args.list_id or '@default'
-    
-    # Get task list info
-    task_list = api.get_task_list(tasklist_id)
-    list_title = task_list.get("title", "Tasks") if task_list else "Tasks"
-    
-    # Determine if we should show completed tasks
-    show_completed = args.status in ["completed", "all"]
-    
-    # Fetch tasks
-    tasks = api.list_tasks(
-        tasklist_id=tasklist_id,
-        show_completed=show_completed,
-        max_results=100
-    )
-    
-    if tasks is None:
-        print("Error: Failed to fetch tasks", file=sys.stderr)
-        return 1
-    
-    # Format tasks
-    formatted_tasks = [format_task(t) for t in tasks]
-    
-    # Filter by status if needed
-    if args.status == "needsAction":
-        formatted_tasks = [t for t in formatted_tasks if t["status"] != "completed"]
-    elif args.status == "completed":
-        formatted_tasks = [t for t in formatted_tasks if t["status"] == "completed"]
-    
-    # Sort by due date (tasks with no due date go last)
-    formatted_tasks.sort(
-        key=lambda x: x.get("due") or "9999-12-31T23:59:59.000Z"
-    )
-    
-    # Build markdown content
-    lines = []
-    
-    # Header
-    lines.append(f"# {list_title}")
-    lines.append("")
-    lines.append(f"*Exported: {datetime.now().strftime('%Y-%m-%d %H:%M')}*")
-    lines.append("")
-    lines.append(f"**Total Tasks:** {len(formatted_tasks)}")
-    lines.append(f"**Status Filter:** {args.status}")
-    lines.append("")
-    lines.append("---")
-    lines.append("")
-    
-    # Group by due date
-    today = datetime.now().strftime('%Y-%m-%d')
-    
-    overdue = []
-    due_today = []
-    upcoming = []
-    no_due_date = []
-    
-    for task in formatted_tasks:
+def build_tree(tasks) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+    """Split tasks into top-level tasks and subtasks keyed by parent ID.
+    
+    Subtasks are sorted by `position`. A subtask whose parent was not
+    exported (e.g. filtered out by status) is treated as top-level.
+    """
+    tasks = list(tasks)
+    ids = {task["id"] for task in tasks}
+    roots = []
+    children = {}
+    for task in tasks:
+        parent = task.get("parent")
+        if parent in ids:
+            children.setdefault(parent, []).append(task)
+        else:
+            roots.append(task)
+    for siblings in children.values():
+        siblings.sort(key=lambda t: t.get("position") or "")
+    return roots, children
+
+def group_by_due(roots: List[Dict], today: str) -> Dict[str, List[Dict]]:
+    """Group top-level tasks by due date relative to `today` (YYYY-MM-DD)."""
+    groups = {key: [] for key, _ in GROUPS}
+    for task in roots:
         if task.get("due"):
             due_date = task["due"][:10]
             if due_date < today:
-                overdue.append(task)
+                groups["overdue"].append(task)
             elif due_date == today:
-                due_today.append(task)
+                groups["today"].append(task)
             else:
-                upcoming.append(task)
+                groups["upcoming"].append(task)
+        else:
+            groups["no_due"].append(task)
+    
+    # Sort by due date, keeping list order among tasks due the same day
+    for key in ("overdue", "today", "upcoming"):
+        groups[key].sort(key=lambda t: (t["due"], t.get("position") or ""))
+    groups["no_due"].sort(key=lambda t: t.get("position") or "")
+    return groups
+
+def regroup_date(roots: List[Dict], today: str) -> Optional[str]:
+    """First day on which a task moves to another due-date group, or None.
+    
+    An unchanged list exported before this day still renders identically.
+    """
+    days = []
+    for task in roots:
+        due_date = (task.get("due") or "")[:10]
+        if due_date > today:
+            days.append(due_date)
+        elif due_date == today:
+            days.append((datetime.strptime(today, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d"))
+    return min(days, default=None)
+
+def render_task(task: Dict, children: Dict[str, List[Dict]], indent: int = 0) -> Iterator[str]:
+    yield format_task_markdown(task, indent)
+    for child in children.get(task["id"], []):
+        yield from render_task(child, children, indent + 1)
+
+def markdown_lines(list_title: str, groups: Dict[str, List[Dict]], children: Dict[str, List[Dict]],
+                   task_count: int, status: str) -> Iterator[str]:
+    """Yield the export's lines one at a time."""
+    # Header
+    yield f"# {list_title}"
+    yield ""
+    yield f"*Exported: {datetime.now().strftime('%Y-%m-%d %H:%M')}*"
+    yield ""
+    yield f"**Total Tasks:** {task_count}"
+    yield f"**Status Filter:** {status}"
+    yield ""
+    yield "---"
+    yield ""
+    
+    for key, heading in GROUPS:
+        if not groups[key]:
+            continue
+        yield heading
+        yield ""
+        for task in groups[key]:
+            yield from render_task(task, children)
+            yield ""
+
+def write_lines(path: Path, lines: Iterator[str]):
+    """Stream lines to a temporary file, then move it over `path`.
+    
+    Readers (e.g. Obsidian) never see a half-written file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line)
+            f.write("\n")
+    os.replace(tmp_path, path)
+
+def export_tasks(path: Path, list_title: str, tasks, status: str, today: str) -> Dict:
+    """Write one list's tasks to `path`; returns its task count and regroup date."""
+    roots, children = build_tree(map(format_task, tasks))
+    task_count = len(roots) + sum(len(siblings) for siblings in children.values())
+    groups = group_by_due(roots, today)
+    write_lines(path, markdown_lines(list_title, groups, children, task_count, status))
+    return {"task_count": task_count, "regroup_on": regroup_date(roots, today)}
+
+def load_manifest(output_dir: Path) -> Dict:
+    try:
+        return json.loads((output_dir / MANIFEST_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(output_dir: Path, manifest: Dict):
+    write_lines(output_dir / MANIFEST_FILE, [json.dumps(manifest, indent=2, ensure_ascii=False)])
+
+def is_unchanged(entry: Optional[Dict], tasklist: Dict, output_dir: Path, status: str, today: str) -> bool:
+    """Whether the previous export of this list is still current."""
+    if not entry or entry.get("status") != status:
+        return False
+    if not tasklist.get("updated") or entry.get("updated") != tasklist.get("updated"):
+        return False
+    if entry.get("regroup_on") and today >= entry["regroup_on"]:
+        return False
+    return (output_dir / entry["file"]).exists()
+
+def file_name(title: str, list_id: str, taken: set) -> str:
+    slug = re.sub(r'[^\w\- ]+', '', title or "").strip() or "Tasks"
+    name = f"{slug}.md"
+    if name in taken:
+        name = f"{slug} ({list_id}).md"
+    return name
+
+def export_single(args, tasklist_id: str, today: str) -> int:
+    cache = None
+    try:
+        if args.cached:
+            cache = TaskCache(GoogleTasksAPI)
+            tasklist_id = cache.ensure_fresh(tasklist_id, max_age=args.max_age)
+            list_title = cache.list_title(tasklist_id) or "Tasks"
+            tasks = list(cache.iter_tasks(tasklist_id, status=args.status))
         else:
-            no_due_date.append(task)
-    
-    # Overdue tasks
-    if overdue:
-        lines.append("## ⚠️ Overdue")
-        lines.append("")
-        for task in overdue:
-            lines.append(format_task_markdown(task))
-            lines.append("")
-    
-    # Due today
-    if due_today:
-        lines.append("## 📅 Due Today")
-        lines.append("")
-        for task in due_today:
-            lines.append(format_task_markdown(task))
-            lines.append("")
-    
-    # Upcoming
-    if upcoming:
-        lines.append("## 📆 Upcoming")
-        lines.append("")
-        for task in upcoming:
-            lines.append(format_task_markdown(task))
-            lines.append("")
-    
-    # No due date
-    if no_due_date:
-        lines.append("## 📋 No Due Date")
-        lines.append("")
-        for task in no_due_date:
-            lines.append(format_task_markdown(task))
-            lines.append("")
-    
-    # Write to file
-    markdown_content = "\n".join(lines)
+            api = GoogleTasksAPI()
+            
+            # Get task list info
+            task_list = api.get_task_list(tasklist_id)
+            list_title = task_list.get("title", "Tasks") if task_list else "Tasks"
+            
+            # Stream every page; the status filter is applied by the server
+            tasks = list(api.iter_tasks(tasklist_id, **status_filters(args.status)))
+    except Exception as e:
+        print(f"Error: Failed to fetch tasks: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if cache is not None:
+            cache.close()
     
     try:
         output_path = Path(args.output_file)
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_path.write_text(markdown_content)
+        result = export_tasks(output_path, list_title, tasks, args.status, today)
+    except Exception as e:
+        print(f"Error writing output file: {e}", file=sys.stderr)
+        return 1
+    
+    print(f"✓ Exported {result['task_count']} tasks to {args.output_file}", file=sys.stderr)
+    
+    # Also print JSON summary
+    print(json.dumps({
+        "success": True,
+        "output_file": str(output_path),
+        "task_count": result["task_count"],
+        "list_title": list_title
+    }, indent=2))
+    
+    return 0
+
+def export_directory(args, today: str) -> int:
+    output_dir = Path(args.output_dir)
+    manifest = load_manifest(output_dir)
+    exported, skipped, errors = [], [], []
+    
+    cache = None
+    try:
+        if args.cached:
+            cache = TaskCache(GoogleTasksAPI)
+            task_lists = cache.task_lists(max_age=args.max_age)
+            resolve = cache.resolve_list
+        else:
+            api = GoogleTasksAPI()
+            task_lists = api.list_task_lists()
+            if task_lists is None:
+                raise RuntimeError("Could not list task lists")
+            resolve = lambda list_id: list_id if list_id != "@default" else api.get_task_list(list_id)["id"]
+        
+        if args.list_id:
+            wanted = {resolve(list_id) for list_id in args.list_id}
+            task_lists = [tasklist for tasklist in task_lists if tasklist["id"] in wanted]
         
-        print(f"✓ Exported {len(formatted_tasks)} tasks to {args.output_file}", file=sys.stderr)
+        changed = []
+        for tasklist in task_lists:
+            if not args.force and is_unchanged(manifest.get(tasklist["id"]), tasklist, output_dir, args.status, today):
+                skipped.append(tasklist.get("title"))
+            else:
+                changed.append(tasklist)
         
-        # Also print JSON summary
-        import json
-        print(json.dumps({
-            "success": True,
-            "output_file": str(output_path),
-            "task_count": len(formatted_tasks),
-            "list_title": list_title
-        }, indent=2))
+        # Only lists that changed are fetched
+        if args.cached:
+            results, failures = {}, {}
+            for tasklist in changed:
+                try:
+                    cache.ensure_fresh(tasklist["id"], max_age=args.max_age)
+                    results[tasklist["id"]] = list(cache.iter_tasks(tasklist["id"], status=args.status))
+                except Exception as e:
+                    failures[tasklist["id"]] = e
+        else:
+            results, failures = api.fetch_lists([tasklist["id"] for tasklist in changed],
+                                                workers=args.workers, **status_filters(args.status))
+    except Exception as e:
+        print(f"Error: Failed to fetch tasks: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if cache is not None:
+            cache.close()
+    
+    taken = {entry["file"] for entry in manifest.values()}
+    for tasklist in changed:
+        list_id = tasklist["id"]
+        title = tasklist.get("title") or "Tasks"
+        if list_id in failures:
+            errors.append({"list_id": list_id, "list_title": title, "error": str(failures[list_id])})
+            print(f"✗ Failed to export {title}: {failures[list_id]}", file=sys.stderr)
+            continue
         
-        return 0
+        # A list keeps its file name across exports, even if renamed
+        entry = manifest.get(list_id) or {"file": file_name(title, list_id, taken)}
+        taken.add(entry["file"])
+        try:
+            result = export_tasks(output_dir / entry["file"], title, results[list_id], args.status, today)
+        except Exception as e:
+            errors.append({"list_id": list_id, "list_title": title, "error": str(e)})
+            print(f"✗ Failed to export {title}: {e}", file=sys.stderr)
+            continue
+        
+        manifest[list_id] = {
+            "file": entry["file"],
+            "title": title,
+            "updated": tasklist.get("updated"),
+            "status": args.status,
+            "task_count": result["task_count"],
+            "regroup_on": result["regroup_on"],
+            "exported": datetime.now().isoformat(timespec="seconds")
+        }
+        exported.append({"list_title": title, "file": entry["file"], "task_count": result["task_count"]})
+        print(f"✓ Exported {result['task_count']} tasks to {output_dir / entry['file']}", file=sys.stderr)
     
+    try:
+        save_manifest(output_dir, manifest)
     except Exception as e:
-        print(f"Error writing output file: {e}", file=sys.stderr)
+        print(f"Error writing manifest: {e}", file=sys.stderr)
+        return 1
+    
+    print(f"✓ {len(exported)} lists exported, {len(skipped)} unchanged", file=sys.stderr)
+    
+    print(json.dumps({
+        "success": len(errors) == 0,
+        "output_dir": str(output_dir),
+        "exported": exported,
+        "skipped": skipped,
+        "errors": errors
+    }, indent=2, ensure_ascii=False))
+    
+    return 0 if not errors else 1
+
+def main():
+    args = parse_args()
+    today = datetime.now().strftime('%Y-%m-%d')
+    
+    if args.output_dir:
+        return export_directory(args, today)
+    
+    if args.list_id and len(args.list_id) > 1:
+        print("Error: Several --list-id values need --output-dir", file=sys.stderr)
         return 1
+    
+    # Use default list if not specified
+    tasklist_id = args.list_id[0] if args.list_id else '@default'
+    
+    return export_single(args, tasklist_id, today)
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -1,50 +1,110 @@
 #!/usr/bin/env python3
 """
 Common utilities for Google Tasks API interactions.
+
+Scripts start fast: the Google client libraries are imported only when the
+first API call needs them, the service is built from a discovery document
+cached in the skill directory, and an expired token is refreshed by the first
+request instead of up front.
 """
 
 import os
+import re
 import sys
 import json
+import time
+import atexit
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from itertools import islice
 from pathlib import Path
-from typing import Optional, Dict, Any, List
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from typing import Optional, Dict, Any, List, Iterator, Tuple, Callable
 from datetime import datetime
 
 SKILL_DIR = Path(__file__).parent.parent
 TOKEN_FILE = SKILL_DIR / "token.json"
+DISCOVERY_FILE = SKILL_DIR / "tasks_discovery.json"
 SCOPES = ['https://www.googleapis.com/auth/tasks']
 
+# tasks().list() returns at most 100 tasks per page.
+MAX_PAGE_SIZE = 100
+# Every completed task has a completion time after this, so completedMin=EPOCH
+# asks the server for completed tasks only.
+EPOCH = '1970-01-01T00:00:00.000Z'
+
+# Calls per BatchHttpRequest, and batch requests in flight at once.
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_WORKERS = 4
+# Task lists fetched at once by fetch_lists() when no worker count is given.
+MAX_LIST_WORKERS = 10
+MAX_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# YYYY-MM-DD, optionally followed by a UTC time; parsed without dateutil.
+ISO_DATE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?Z?)?$')
+
 class GoogleTasksAPI:
-    """Wrapper for Google Tasks API operations."""
+    """Wrapper for Google Tasks API operations.
+    
+    Credentials and the service are loaded on first use, so constructing the
+    wrapper costs nothing.
+    """
     
     def __init__(self):
-        """Initialize the API client with stored credentials."""
-        self.creds = self._load_credentials()
-        self.service = build('tasks', 'v1', credentials=self.creds)
+        self._local = threading.local()
     
-    def _load_credentials(self) -> Credentials:
-        """Load and validate credentials from token file."""
+    @cached_property
+    def creds(self):
+        return self._load_credentials()
+    
+    @cached_property
+    def service(self):
+        from googleapiclient.discovery import build, build_from_document
+        document = load_discovery_document()
+        if document is None:
+            return build('tasks', 'v1', credentials=self.creds)
+        return build_from_document(document, http=self._thread_http())
+    
+    def _load_credentials(self):
+        """Load credentials from the token file.
+        
+        An expired access token is not refreshed here: the first request
+        refreshes it, and the new token is written back when the script exits.
+        """
+        from google.oauth2.credentials import Credentials
+        
         if not TOKEN_FILE.exists():
             print("Error: token.json not found. Please run auth.py first.", file=sys.stderr)
             sys.exit(1)
         
         creds = Credentials.from_authorized_user_file(str(TOKEN_FILE), SCOPES)
+        token = creds.token
         
-        # Refresh if expired
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-            TOKEN_FILE.write_text(creds.to_json())
+        def save_refreshed():
+            if creds.token != token:
+                tmp_path = TOKEN_FILE.with_suffix('.tmp')
+                tmp_path.write_text(creds.to_json())
+                os.replace(tmp_path, TOKEN_FILE)
         
+        atexit.register(save_refreshed)
         return creds
     
+    def iter_task_lists(self) -> Iterator[Dict]:
+        """Yield every task list, following page tokens. API errors are raised."""
+        params = {'maxResults': MAX_PAGE_SIZE}
+        while True:
+            results = self.service.tasklists().list(**params).execute()
+            yield from results.get('items', [])
+            params['pageToken'] = results.get('nextPageToken')
+            if not params['pageToken']:
+                return
+    
     def list_task_lists(self) -> Optional[List[Dict]]:
         """Get all task lists."""
         try:
-            results = self.service.tasklists().list().execute()
-            return results.get('items', [])
+            return list(self.iter_task_lists())
         except Exception as e:
             print(f"Error listing task lists: {e}", file=sys.stderr)
             return None
@@ -57,17 +117,52 @@ class GoogleTasksAPI:
             print(f"Error getting task list: {e}", file=sys.stderr)
             return None
     
+    def create_task_list(self, title: str) -> Optional[Dict]:
+        """Create a new task list."""
+        try:
+            return self.service.tasklists().insert(body={'title': title}).execute()
+        except Exception as e:
+            print(f"Error creating task list: {e}", file=sys.stderr)
+            return None
+    
+    def iter_tasks(self, tasklist_id: str, show_completed: bool = False, show_hidden: bool = False,
+                   show_deleted: bool = False, updated_min: Optional[str] = None,
+                   due_min: Optional[str] = None, due_max: Optional[str] = None,
+                   completed_min: Optional[str] = None, completed_max: Optional[str] = None,
+                   page_size: int = MAX_PAGE_SIZE, http=None) -> Iterator[Dict]:
+        """Yield every task in a task list, fetching the next page only when needed.
+        
+        Filters are applied by the server (RFC 3339 timestamps). API errors are
+        raised to the caller. Pass `http` to page over a connection other than
+        the service's own (e.g. from a worker thread).
+        """
+        params = {
+            'tasklist': tasklist_id,
+            'showCompleted': show_completed,
+            'showHidden': show_hidden,
+            'showDeleted': show_deleted,
+            'maxResults': min(page_size, MAX_PAGE_SIZE),
+            'updatedMin': updated_min,
+            'dueMin': due_min,
+            'dueMax': due_max,
+            'completedMin': completed_min,
+            'completedMax': completed_max,
+        }
+        params = {k: v for k, v in params.items() if v is not None}
+        
+        while True:
+            results = self.service.tasks().list(**params).execute(http=http)
+            yield from results.get('items', [])
+            params['pageToken'] = results.get('nextPageToken')
+            if not params['pageToken']:
+                return
+    
     def list_tasks(self, tasklist_id: str, show_completed: bool = False, 
-                   show_hidden: bool = False, max_results: int = 100) -> Optional[List[Dict]]:
-        """Get tasks from a task list."""
+                   show_hidden: bool = False, max_results: Optional[int] = 100) -> Optional[List[Dict]]:
+        """Get up to max_results tasks from a task list (all of them if None)."""
         try:
-            results = self.service.tasks().list(
-                tasklist=tasklist_id,
-                showCompleted=show_completed,
-                showHidden=show_hidden,
-                maxResults=max_results
-            ).execute()
-            return results.get('items', [])
+            tasks = self.iter_tasks(tasklist_id, show_completed=show_completed, show_hidden=show_hidden)
+            return list(islice(tasks, max_results))
         except Exception as e:
             print(f"Error listing tasks: {e}", file=sys.stderr)
             return None
@@ -83,17 +178,227 @@ class GoogleTasksAPI:
             print(f"Error getting task: {e}", file=sys.stderr)
             return None
     
+    def insert_request(self, tasklist_id: str, task_data: Dict):
+        """Build (but don't execute) a tasks().insert() request.
+        
+        'parent' and 'previous' position the task and are sent as query
+        parameters; the API ignores them in the request body.
+        """
+        body = dict(task_data)
+        position = {key: body.pop(key) for key in ('parent', 'previous') if body.get(key)}
+        return self.service.tasks().insert(tasklist=tasklist_id, body=body, **position)
+    
     def create_task(self, tasklist_id: str, task_data: Dict) -> Optional[Dict]:
         """Create a new task."""
         try:
-            return self.service.tasks().insert(
-                tasklist=tasklist_id,
-                body=task_data
-            ).execute()
+            return self.insert_request(tasklist_id, task_data).execute()
         except Exception as e:
             print(f"Error creating task: {e}", file=sys.stderr)
             return None
     
+    def _thread_http(self):
+        # httplib2 is not thread-safe: each worker thread keeps its own connection.
+        if self.creds is None:
+            return None
+        if getattr(self._local, 'http', None) is None:
+            import httplib2
+            import google_auth_httplib2
+            self._local.http = google_auth_httplib2.AuthorizedHttp(self.creds, http=httplib2.Http())
+        return self._local.http
+    
+    def batch_execute(self, requests: List[Tuple[Any, Any]], batch_size: int = DEFAULT_BATCH_SIZE,
+                      workers: int = DEFAULT_WORKERS, on_batch=None) -> Tuple[Dict, Dict]:
+        """Execute (key, HttpRequest) pairs as batch requests, `workers` batches at a time.
+        
+        Returns (results, errors), two dicts keyed by the caller's keys. Calls
+        rejected with a rate-limit or server error are retried with backoff.
+        on_batch(outcomes) is called as each batch finishes, one call at a
+        time, with a (key, response, error) tuple for every request in it.
+        """
+        chunks = [requests[i:i + batch_size] for i in range(0, len(requests), batch_size)]
+        return self._execute_chunks(chunks, workers, on_batch)
+    
+    def _execute_chunks(self, chunks: List[List[Tuple[Any, Any]]], workers: int = DEFAULT_WORKERS,
+                        on_batch=None) -> Tuple[Dict, Dict]:
+        """batch_execute() with the caller choosing which requests share a batch."""
+        results = {}
+        errors = {}
+        lock = threading.Lock()
+        
+        def finish(chunk):
+            if on_batch:
+                with lock:
+                    on_batch([(key, results.get(key), None if key in results else errors.get(key, "No response"))
+                              for key, _ in chunk])
+        
+        def run(chunk):
+            pending = chunk
+            for attempt in range(MAX_RETRIES + 1):
+                retry = []
+                
+                def callback(request_id, response, exception):
+                    key, request = pending[int(request_id)]
+                    if exception is None:
+                        results[key] = response
+                    elif _is_retryable(exception) and attempt < MAX_RETRIES:
+                        retry.append((key, request))
+                    else:
+                        errors[key] = exception
+                
+                batch = self.service.new_batch_http_request(callback=callback)
+                for index, (key, request) in enumerate(pending):
+                    batch.add(request, request_id=str(index))
+                batch.execute(http=self._thread_http())
+                
+                if not retry:
+                    break
+                time.sleep(min(32, 2 ** attempt) + random.random())
+                pending = retry
+            finish(chunk)
+        
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(run, chunks))
+        return results, errors
+    
+    def fetch_lists(self, tasklist_ids: List[str], collect: Callable[[Iterator[Dict]], Any] = list,
+                    workers: Optional[int] = None, **filters) -> Tuple[Dict[str, Any], Dict[str, Exception]]:
+        """Fetch several task lists concurrently, one list per worker thread.
+        
+        Each worker pages through its list with iter_tasks(**filters) over its
+        own authorized Http, so the whole call takes about as long as the
+        slowest list. `collect` is applied to each list's task iterator in its
+        worker, so a list can be reduced while it streams in. Returns
+        `(results, errors)`, both keyed by list ID.
+        """
+        results, errors = {}, {}
+        if not tasklist_ids:
+            return results, errors
+        
+        def fetch(tasklist_id):
+            try:
+                results[tasklist_id] = collect(self.iter_tasks(tasklist_id, http=self._thread_http(), **filters))
+            except Exception as e:
+                errors[tasklist_id] = e
+        
+        workers = workers or min(len(tasklist_ids), MAX_LIST_WORKERS)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(fetch, tasklist_ids))
+        return results, errors
+    
+    def create_task_tree(self, tasklist_id: str, nodes: List[Dict], batch_size: int = DEFAULT_BATCH_SIZE,
+                         workers: int = DEFAULT_WORKERS, on_result=None, on_batch=None,
+                         existing: Optional[Dict] = None, keep_order: bool = False) -> Tuple[Dict, Dict]:
+        """Create tasks whose parents may be other tasks in the same import.
+        
+        Each node is {'key', 'task' (insert body), 'parent_key' (optional),
+        'list_id' (optional)}. Tasks are created one tree level per round: a
+        level is submitted as batch requests once every parent in it exists.
+        Nodes whose parent failed are not attempted.
+        
+        `existing` maps keys of nodes created earlier (e.g. by an interrupted
+        run) to their tasks; those nodes are not submitted again, but their
+        children are created under them.
+        
+        Siblings are sent in reverse, which keeps their order only when the
+        server applies a batch in sequence; Google does not guarantee that.
+        With `keep_order`, each task is placed after its previous sibling
+        instead, at the cost of one round per sibling position (each round
+        covers every parent at once).
+        
+        Returns (created, errors) keyed by node key, including `existing`.
+        on_result(node, task, error) is called as each node finishes, and
+        on_batch() after each batch's on_result calls (e.g. to flush a
+        journal); both are called one at a time.
+        """
+        created = dict(existing or {})
+        errors = {}
+        by_key = {node['key']: node for node in nodes}
+        
+        def depth(node):
+            level = 0
+            while node.get('parent_key') is not None:
+                node = by_key[node['parent_key']]
+                level += 1
+            return level
+        
+        levels = {}
+        for node in nodes:
+            levels.setdefault(depth(node), []).append(node)
+        
+        for level in sorted(levels):
+            siblings = {}
+            for node in levels[level]:
+                if node['key'] in created:
+                    continue
+                parent_key = node.get('parent_key')
+                if parent_key is not None and parent_key not in created:
+                    errors[node['key']] = "Parent task was not created"
+                    if on_result:
+                        on_result(node, None, errors[node['key']])
+                    continue
+                node['list_id'] = by_key[parent_key]['list_id'] if parent_key is not None else (node.get('list_id') or tasklist_id)
+                siblings.setdefault((node['list_id'], parent_key), []).append(node)
+
+            def request(node, previous=None):
+                task_data = dict(node['task'])
+                if node.get('parent_key') is not None:
+                    task_data['parent'] = created[node['parent_key']]['id']
+                if previous is not None:
+                    task_data['previous'] = created[previous['key']]['id']
+                return (node['key'], self.insert_request(node['list_id'], task_data))
+
+            def previous_sibling(group, index):
+                # The nearest earlier sibling that was created
+                return next((group[i] for i in range(index - 1, -1, -1) if group[i]['key'] in created), None)
+
+            rounds = []
+            for group in siblings.values():
+                if keep_order:
+                    # Round i creates every parent's i-th child after its
+                    # (i-1)-th, so the order holds whatever order a batch
+                    # is applied in.
+                    for round_index, node in enumerate(group):
+                        if round_index == len(rounds):
+                            rounds.append([])
+                        rounds[round_index].append([(node, group, round_index)])
+                    continue
+                # New tasks go to the top of their siblings, so each parent's
+                # children are submitted last first: in reverse within a batch
+                # (which keeps the file order when the server applies a batch in
+                # sequence), and with more than batch_size children, the later
+                # slices in earlier rounds. A round's batches run in parallel, and
+                # never hold two slices of the same parent's children.
+                slices = [group[i:i + batch_size] for i in range(0, len(group), batch_size)]
+                for round_index, chunk in enumerate(reversed(slices)):
+                    if round_index == len(rounds):
+                        rounds.append([])
+                    rounds[round_index].append([(node, None, None) for node in chunk[::-1]])
+
+            def finished(outcomes):
+                for key, response, error in reversed(outcomes):
+                    if response is not None:
+                        created[key] = response
+                    else:
+                        errors[key] = str(error)
+                    if on_result:
+                        on_result(by_key[key], response, errors.get(key))
+                if on_batch:
+                    on_batch()
+
+            for chunks in rounds:
+                batches = []
+                for chunk in chunks:
+                    chunk = [request(node, previous_sibling(group, index) if group else None)
+                             for node, group, index in chunk]
+                    # Pack whole slices into batches of up to batch_size requests
+                    if batches and len(batches[-1]) + len(chunk) <= batch_size:
+                        batches[-1].extend(chunk)
+                    else:
+                        batches.append(chunk)
+                self._execute_chunks(batches, workers, on_batch=finished)
+        
+        return created, errors
+    
     def update_task(self, tasklist_id: str, task_id: str, task_data: Dict) -> Optional[Dict]:
         """Update an existing task."""
         try:
@@ -106,30 +411,57 @@ class GoogleTasksAPI:
             print(f"Error updating task: {e}", file=sys.stderr)
             return None
     
+    def patch_request(self, tasklist_id: str, task_id: str, fields: Dict):
+        """Build (but don't execute) a tasks().patch() request sending only `fields`."""
+        return self.service.tasks().patch(tasklist=tasklist_id, task=task_id, body=fields)
+    
+    def patch_task(self, tasklist_id: str, task_id: str, fields: Dict) -> Optional[Dict]:
+        """Change only the given fields of a task; None values clear a field."""
+        try:
+            return self.patch_request(tasklist_id, task_id, fields).execute()
+        except Exception as e:
+            print(f"Error updating task: {e}", file=sys.stderr)
+            return None
+    
     def complete_task(self, tasklist_id: str, task_id: str) -> Optional[Dict]:
         """Mark a task as complete."""
         try:
-            task = self.get_task(tasklist_id, task_id)
-            if task:
-                task['status'] = 'completed'
-                return self.update_task(tasklist_id, task_id, task)
-            return None
+            return self.patch_request(tasklist_id, task_id, {'status': 'completed'}).execute()
         except Exception as e:
             print(f"Error completing task: {e}", file=sys.stderr)
             return None
     
+    def delete_request(self, tasklist_id: str, task_id: str):
+        """Build (but don't execute) a tasks().delete() request."""
+        return self.service.tasks().delete(tasklist=tasklist_id, task=task_id)
+    
     def delete_task(self, tasklist_id: str, task_id: str) -> bool:
         """Delete a task."""
         try:
-            self.service.tasks().delete(
-                tasklist=tasklist_id,
-                task=task_id
-            ).execute()
+            self.delete_request(tasklist_id, task_id).execute()
             return True
         except Exception as e:
             print(f"Error deleting task: {e}", file=sys.stderr)
             return False
 
+def _is_retryable(error) -> bool:
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    if status in RETRY_STATUSES:
+        return True
+    return status == 403 and 'rateLimitExceeded' in str(error)
+
+def status_filters(status: str) -> Dict[str, Any]:
+    """iter_tasks() arguments that select tasks by status on the server.
+    
+    Completed tasks are usually hidden (completed in the Google clients), so
+    showHidden is needed to see them.
+    """
+    if status == "completed":
+        return {"show_completed": True, "show_hidden": True, "completed_min": EPOCH}
+    if status == "all":
+        return {"show_completed": True, "show_hidden": True}
+    return {"show_completed": False}
+
 def format_task(task: Dict) -> Dict:
     """Format task data for display."""
     return {
@@ -154,8 +486,34 @@ def format_task_list(tasklist: Dict) -> Dict:
         "self_link": tasklist.get("selfLink")
     }
 
+def load_discovery_document() -> Optional[str]:
+    """Return the Tasks v1 discovery document, caching it in DISCOVERY_FILE.
+    
+    Returns None when no cached or bundled copy exists; build() then fetches it.
+    """
+    if DISCOVERY_FILE.exists():
+        return DISCOVERY_FILE.read_text()
+    
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+    except ImportError:
+        # google-api-python-client < 2.0 does not bundle discovery documents.
+        return None
+    document = get_static_doc('tasks', 'v1')
+    if document:
+        DISCOVERY_FILE.write_text(document)
+    return document
+
 def parse_date(date_string: str) -> str:
     """Parse a date string into RFC 3339 format for Google Tasks API."""
+    match = ISO_DATE.match(date_string.strip())
+    if match:
+        try:
+            dt = datetime(*(int(part) for part in match.groups() if part is not None))
+            return dt.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        except ValueError:
+            pass  # e.g. 2026-02-30; let dateutil report it
+    
     from dateutil import parser as date_parser
     try:
         dt = date_parser.parse(date_string)
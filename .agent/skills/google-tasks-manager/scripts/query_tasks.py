@@ -4,22 +4,39 @@ Query tasks from Google Tasks with optional filters.
 """
 
 import sys
+import heapq
 import argparse
+from itertools import islice
 from pathlib import Path
 
 # Add scripts directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from google_tasks_api import GoogleTasksAPI, format_task, print_json
+from google_tasks_api import GoogleTasksAPI, format_task, format_task_list, parse_date, print_json, status_filters
+from task_cache import TaskCache, DEFAULT_MAX_AGE
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Query tasks from Google Tasks")
     
-    parser.add_argument(
+    target = parser.add_mutually_exclusive_group()
+    
+    target.add_argument(
         "--list-id",
         help="Task list ID (uses default list '@default' if not specified)"
     )
     
+    target.add_argument(
+        "--all-lists",
+        action="store_true",
+        help="Query every task list at once and merge the results by due date"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="With --all-lists, task lists fetched at once (default: one per list, up to 10)"
+    )
+    
     parser.add_argument(
         "--status",
         choices=["needsAction", "completed", "all"],
@@ -34,50 +51,160 @@ def parse_args():
         help="Maximum number of tasks to return (default: 50)"
     )
     
+    parser.add_argument(
+        "--due-min",
+        help="Only tasks due on or after this date"
+    )
+    
+    parser.add_argument(
+        "--due-max",
+        help="Only tasks due before this date"
+    )
+    
+    parser.add_argument(
+        "--updated-min",
+        help="Only tasks modified since this date/time"
+    )
+    
+    parser.add_argument(
+        "--cached",
+        action="store_true",
+        help="Answer from the local task cache, syncing only changes when it is stale"
+    )
+    
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=DEFAULT_MAX_AGE,
+        help=f"With --cached, seconds before the cache is re-synced (default: {DEFAULT_MAX_AGE}; 0 always syncs)"
+    )
+    
     return parser.parse_args()
 
+def due_sort_key(task):
+    # Tasks with no due date go last
+    return task.get("due") or "9999-12-31T23:59:59.000Z"
+
+def query_cache(tasklist_id, args, dates):
+    """Answer from the local cache; returns (list_id, formatted tasks)."""
+    cache = TaskCache(GoogleTasksAPI)
+    try:
+        tasklist_id = cache.ensure_fresh(tasklist_id, max_age=args.max_age)
+        tasks = cache.query(tasklist_id, status=args.status, limit=args.limit, **dates)
+    finally:
+        cache.close()
+    return tasklist_id, [format_task(t) for t in tasks]
+
+def merge_lists(results, titles, limit):
+    """Merge per-list task lists (each sorted by due date) into the `limit` earliest overall."""
+    def tagged(tasklist_id):
+        for task in results[tasklist_id]:
+            task["list_id"] = tasklist_id
+            task["list_title"] = titles.get(tasklist_id)
+            yield task
+    
+    merged = heapq.merge(*(tagged(tasklist_id) for tasklist_id in results), key=due_sort_key)
+    return list(islice(merged, limit))
+
+def query_all_lists(args, dates):
+    """Fetch every task list concurrently; returns (lists, formatted tasks, errors)."""
+    api = GoogleTasksAPI()
+    task_lists = api.list_task_lists()
+    if task_lists is None:
+        raise RuntimeError("Could not list task lists")
+    titles = {tasklist["id"]: tasklist.get("title") for tasklist in task_lists}
+    
+    # Each worker keeps only its list's `limit` earliest-due tasks
+    def earliest(tasks):
+        return heapq.nsmallest(args.limit, map(format_task, tasks), key=due_sort_key)
+    
+    results, errors = api.fetch_lists(list(titles), collect=earliest, workers=args.workers,
+                                      **status_filters(args.status), **dates)
+    return task_lists, merge_lists(results, titles, args.limit), errors
+
+def query_all_cached(args, dates):
+    """--all-lists answered from the local cache."""
+    cache = TaskCache(GoogleTasksAPI)
+    results, errors = {}, {}
+    try:
+        task_lists = cache.task_lists(max_age=args.max_age)
+        for tasklist in task_lists:
+            try:
+                cache.ensure_fresh(tasklist["id"], max_age=args.max_age)
+                tasks = cache.query(tasklist["id"], status=args.status, limit=args.limit, **dates)
+                results[tasklist["id"]] = [format_task(t) for t in tasks]
+            except Exception as e:
+                errors[tasklist["id"]] = e
+    finally:
+        cache.close()
+    titles = {tasklist["id"]: tasklist.get("title") for tasklist in task_lists}
+    return task_lists, merge_lists(results, titles, args.limit), errors
+
 def main():
     args = parse_args()
-    api = GoogleTasksAPI()
     
     # Use default list if not specified
     tasklist_id = args.list_id or '@default'
     
-    # Determine if we should show completed tasks
-    show_completed = args.status in ["completed", "all"]
+    dates = {}
+    for name in ("due_min", "due_max", "updated_min"):
+        if getattr(args, name):
+            dates[name] = parse_date(getattr(args, name))
     
-    # Fetch tasks
-    tasks = api.list_tasks(
-        tasklist_id=tasklist_id,
-        show_completed=show_completed,
-        max_results=args.limit
-    )
+    filters = {
+        "status": args.status,
+        "limit": args.limit,
+        "due_min": args.due_min,
+        "due_max": args.due_max,
+        "updated_min": args.updated_min
+    }
     
-    if tasks is None:
-        print("Error: Failed to fetch tasks", file=sys.stderr)
-        return 1
+    if args.all_lists:
+        try:
+            if args.cached:
+                task_lists, formatted_tasks, errors = query_all_cached(args, dates)
+            else:
+                task_lists, formatted_tasks, errors = query_all_lists(args, dates)
+        except Exception as e:
+            print(f"Error: Failed to fetch tasks: {e}", file=sys.stderr)
+            return 1
+        
+        titles = {tasklist["id"]: tasklist.get("title") for tasklist in task_lists}
+        for list_id, error in errors.items():
+            print(f"✗ Failed to fetch list {titles.get(list_id)}: {error}", file=sys.stderr)
+        
+        print_json({
+            "count": len(formatted_tasks),
+            "lists": [format_task_list(tasklist) for tasklist in task_lists],
+            "cached": args.cached,
+            "filters": filters,
+            "tasks": formatted_tasks,
+            "errors": [
+                {"list_id": list_id, "list_title": titles.get(list_id), "error": str(error)}
+                for list_id, error in errors.items()
+            ]
+        })
+        
+        return 0 if not errors else 1
     
-    # Filter by status if needed
-    if args.status == "needsAction":
-        tasks = [t for t in tasks if t.get("status") != "completed"]
-    elif args.status == "completed":
-        tasks = [t for t in tasks if t.get("status") == "completed"]
-    
-    # Format tasks
-    formatted_tasks = [format_task(t) for t in tasks]
-    
-    # Sort by due date (tasks with no due date go last)
-    formatted_tasks.sort(
-        key=lambda x: x.get("due") or "9999-12-31T23:59:59.000Z"
-    )
+    try:
+        if args.cached:
+            tasklist_id, formatted_tasks = query_cache(tasklist_id, args, dates)
+        else:
+            # Status and date filters are applied by the server. Stream every
+            # page, keeping only the `limit` earliest-due tasks in memory
+            api = GoogleTasksAPI()
+            tasks = api.iter_tasks(tasklist_id, **status_filters(args.status), **dates)
+            formatted_tasks = heapq.nsmallest(args.limit, map(format_task, tasks), key=due_sort_key)
+    except Exception as e:
+        print(f"Error: Failed to fetch tasks: {e}", file=sys.stderr)
+        return 1
     
     print_json({
         "count": len(formatted_tasks),
         "list_id": tasklist_id,
-        "filters": {
-            "status": args.status,
-            "limit": args.limit
-        },
+        "cached": args.cached,
+        "filters": filters,
         "tasks": formatted_tasks
     })
     
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Two-way sync between checkbox lines in an Obsidian note and a Google Tasks list.
+
+Each synced line carries its task ID in an HTML comment, which Obsidian does
+not render:
+
+    - [ ] Call the bank 📅 2026-01-20 <!-- gt:TASK_ID -->
+
+The state of every task at the last sync is kept in obsidian_sync_state.json
+in the skill folder. Comparing the note and Google Tasks against it tells
+which side changed what, so only changed tasks are written: remote changes
+as batched API requests, and local changes as edits to the affected lines.
+After the first sync, only tasks updated since the previous sync are fetched.
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from google_tasks_api import GoogleTasksAPI, DEFAULT_BATCH_SIZE, DEFAULT_WORKERS, SKILL_DIR, print_json
+from task_cache import SYNC_OVERLAP
+
+STATE_FILE = SKILL_DIR / "obsidian_sync_state.json"
+
+CHECKBOX = re.compile(r'^(?P<indent>\s*)[-*] \[(?P<mark>[ xX])\] (?P<body>.*?)\s*$')
+MARKER = re.compile(r'\s*<!--\s*gt:(?P<id>[\w-]+)\s*-->')
+DUE = re.compile(r'\s*📅\s*(?P<due>\d{4}-\d{2}-\d{2})')
+# Done date added by the Obsidian Tasks plugin; kept in the note, not synced
+DONE = re.compile(r'\s*✅\s*(?P<done>\d{4}-\d{2}-\d{2})')
+
+FIELDS = ("title", "status", "due")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Two-way sync between an Obsidian note and Google Tasks")
+    
+    parser.add_argument(
+        "--note",
+        required=True,
+        help="Markdown note to sync"
+    )
+    
+    parser.add_argument(
+        "--list-id",
+        help="Task list ID (uses default list '@default' if not specified)"
+    )
+    
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show the changes in both directions without applying them"
+    )
+    
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Tasks per batch request (default: {DEFAULT_BATCH_SIZE})"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Batch requests in flight at once (default: {DEFAULT_WORKERS})"
+    )
+    
+    return parser.parse_args()
+
+def parse_note(lines: List[str]) -> List[Dict]:
+    """Checkbox items of a note, with their line index and parent item (by indentation)."""
+    items = []
+    stack = []
+    for index, line in enumerate(lines):
+        match = CHECKBOX.match(line)
+        if not match:
+            continue
+        body = match.group("body")
+        marker = MARKER.search(body)
+        body = MARKER.sub("", body)
+        due = DUE.search(body)
+        body = DUE.sub("", body)
+        done = DONE.search(body)
+        body = DONE.sub("", body)
+        item = {
+            "index": index,
+            "indent": match.group("indent"),
+            "id": marker.group("id") if marker else None,
+            "title": body.strip(),
+            "status": "needsAction" if match.group("mark") == " " else "completed",
+            "due": due.group("due") if due else None,
+            "done": done.group("done") if done else None,
+        }
+        while stack and len(stack[-1]["indent"]) >= len(item["indent"]):
+            stack.pop()
+        item["parent"] = stack[-1] if stack else None
+        stack.append(item)
+        items.append(item)
+    return items
+
+def task_fields(task: Dict) -> Dict:
+    """The synced fields of an API task, in note form."""
+    return {
+        "title": (task.get("title") or "").strip(),
+        "status": task.get("status", "needsAction"),
+        "due": (task.get("due") or "")[:10] or None,
+        "parent": task.get("parent"),
+        "position": task.get("position"),
+    }
+
+def render_line(indent: str, fields: Dict, task_id: Optional[str]) -> str:
+    mark = "x" if fields["status"] == "completed" else " "
+    line = f"{indent}- [{mark}] {fields['title']}"
+    if fields.get("due"):
+        line += f" 📅 {fields['due']}"
+    if fields.get("done") and fields["status"] == "completed":
+        line += f" ✅ {fields['done']}"
+    if task_id:
+        line += f" <!-- gt:{task_id} -->"
+    return line
+
+def patch_body(fields: Dict) -> Dict:
+    """A tasks().patch() body setting the given note fields."""
+    body = {}
+    if "title" in fields:
+        body["title"] = fields["title"]
+    if "status" in fields:
+        body["status"] = fields["status"]
+        if fields["status"] == "needsAction":
+            body["completed"] = None
+    if "due" in fields:
+        body["due"] = f"{fields['due']}T00:00:00.000Z" if fields["due"] else None
+    return body
+
+def load_state() -> Dict:
+    try:
+        return json.loads(STATE_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state: Dict):
+    tmp_path = STATE_FILE.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2, ensure_ascii=False))
+    os.replace(tmp_path, STATE_FILE)
+
+def fetch_remote(api, tasklist_id: str, base: Dict, sync_mark: Optional[str]) -> Dict:
+    """Current remote tasks by ID: the base updated with changes since sync_mark, or a full listing."""
+    if sync_mark is None:
+        tasks = api.iter_tasks(tasklist_id, show_completed=True, show_hidden=True)
+        return {task["id"]: task_fields(task) for task in tasks}
+    
+    remote = {task_id: dict(fields) for task_id, fields in base.items()}
+    for task in api.iter_tasks(tasklist_id, show_completed=True, show_hidden=True,
+                               show_deleted=True, updated_min=sync_mark):
+        if task.get("deleted"):
+            remote.pop(task["id"], None)
+        else:
+            remote[task["id"]] = task_fields(task)
+    return remote
+
+def plan_sync(items: List[Dict], base: Dict, remote: Dict) -> Dict:
+    """Compare note, remote and base; returns the change set in both directions.
+    
+    A field changed on one side only is copied to the other. When both sides
+    changed the same field, the note wins. A line with no base takes Google's
+    version: a marked one, or an unmarked one that matches a remote task by
+    parent, title and due date (e.g. on the first sync of an exported note).
+    Matched lines get the task's ID and are listed under "matched".
+    """
+    plan = {"push_create": [], "push_update": {}, "push_delete": [], "pull_update": {},
+            "pull_remove": [], "pull_add": [], "conflicts": [], "matched": []}
+    
+    # Remote tasks no line is linked to yet, for matching unmarked lines
+    marked = {item["id"] for item in items if item["id"]}
+    unlinked = {}
+    for task_id, fields in remote.items():
+        if task_id not in base and task_id not in marked:
+            unlinked.setdefault((fields["parent"], fields["title"], fields["due"]), []).append(task_id)
+    for matches in unlinked.values():
+        matches.sort(key=lambda t: remote[t]["position"] or "")
+    
+    in_note = {}
+    for item in items:
+        parent = item["parent"]
+        if item["id"] is None and not (parent and parent["id"] is None):
+            matches = unlinked.get((parent["id"] if parent else None, item["title"], item["due"]))
+            if matches:
+                item["id"] = matches.pop(0)
+                plan["matched"].append(item)
+        task_id = item["id"]
+        if task_id is None or task_id in in_note:
+            plan["push_create"].append(item)
+            continue
+        if task_id not in remote:
+            if task_id in base:
+                plan["pull_remove"].append(item)
+            else:
+                # Unknown ID (e.g. deleted before the note was first synced): create it again
+                plan["push_create"].append(item)
+            continue
+        in_note[task_id] = item
+    
+        local = {field: item[field] for field in FIELDS}
+        theirs = remote[task_id]
+        previous = base.get(task_id) or local
+        push, pull = {}, {}
+        for field in FIELDS:
+            if local[field] == theirs[field]:
+                continue
+            if theirs[field] == previous[field]:
+                push[field] = local[field]
+            elif local[field] == previous[field]:
+                pull[field] = theirs[field]
+            else:
+                push[field] = local[field]
+                plan["conflicts"].append({"task_id": task_id, "field": field,
+                                          "note": local[field], "google": theirs[field]})
+        if push:
+            plan["push_update"][task_id] = push
+        if pull:
+            plan["pull_update"][task_id] = pull
+    
+    for task_id, fields in remote.items():
+        if task_id in in_note:
+            continue
+        if task_id in base:
+            # Deleted from the note: delete it, unless it was also edited in Google Tasks
+            if all(fields[field] == base[task_id][field] for field in FIELDS):
+                plan["push_delete"].append(task_id)
+            else:
+                plan["pull_add"].append(task_id)
+        elif fields["status"] == "needsAction":
+            plan["pull_add"].append(task_id)
+    return plan
+
+def new_lines(task_ids: List[str], remote: Dict, items_by_id: Dict[str, Dict]) -> Dict:
+    """Lines for tasks added from Google Tasks, keyed by the line index they go after (-1: end)."""
+    adding = set(task_ids)
+    children = {}
+    for task_id in task_ids:
+        children.setdefault(remote[task_id]["parent"], []).append(task_id)
+    for siblings in children.values():
+        siblings.sort(key=lambda t: remote[t]["position"] or "")
+    
+    def block(task_id, indent):
+        lines = [render_line(indent, remote[task_id], task_id)]
+        for child in children.get(task_id, []):
+            lines.extend(block(child, indent + "  "))
+        return lines
+    
+    inserts = {}
+    for parent_id, siblings in children.items():
+        if parent_id in adding:
+            continue  # rendered inside the parent's block
+        parent = items_by_id.get(parent_id)
+        for task_id in siblings:
+            if parent:
+                inserts.setdefault(parent["last_index"], []).extend(block(task_id, parent["indent"] + "  "))
+            else:
+                inserts.setdefault(-1, []).extend(block(task_id, ""))
+    return inserts
+
+def sync_note(api, note: Path, tasklist_id: str, dry_run: bool = False,
+              batch_size: int = DEFAULT_BATCH_SIZE, workers: int = DEFAULT_WORKERS) -> Dict:
+    """Sync one note with one task list; returns a summary of what changed."""
+    text = note.read_text(encoding="utf-8") if note.exists() else ""
+    lines = text.splitlines()
+    items = parse_note(lines)
+    
+    # Each item's subtree ends at its last descendant's line
+    for item in items:
+        item["last_index"] = item["index"]
+    for item in reversed(items):
+        if item["parent"]:
+            item["parent"]["last_index"] = max(item["parent"]["last_index"], item["last_index"])
+    
+    state = load_state()
+    key = str(note.resolve())
+    entry = state.get(key) or {}
+    if entry.get("list_id") != tasklist_id:
+        entry = {}
+    base = entry.get("tasks", {})
+    
+    started = datetime.now(timezone.utc)
+    remote = fetch_remote(api, tasklist_id, base, entry.get("sync_mark"))
+    plan = plan_sync(items, base, remote)
+    
+    summary = {
+        "note": str(note),
+        "list_id": tasklist_id,
+        "dry_run": dry_run,
+        "pushed": {
+            "created": len(plan["push_create"]),
+            "updated": len(plan["push_update"]),
+            "deleted": len(plan["push_delete"]),
+        },
+        "pulled": {
+            "matched": len(plan["matched"]),
+            "added": len(plan["pull_add"]),
+            "updated": len(plan["pull_update"]),
+            "removed": len(plan["pull_remove"]),
+        },
+        "conflicts": plan["conflicts"],
+        "errors": [],
+    }
+    if dry_run:
+        summary["changes"] = {
+            "create": [item["title"] for item in plan["push_create"]],
+            "update": {task_id: fields for task_id, fields in plan["push_update"].items()},
+            "delete": [base[task_id]["title"] for task_id in plan["push_delete"]],
+            "add_to_note": [remote[task_id]["title"] for task_id in plan["pull_add"]],
+            "link_in_note": {item["id"]: item["title"] for item in plan["matched"]},
+            "update_in_note": {task_id: fields for task_id, fields in plan["pull_update"].items()},
+            "remove_from_note": [item["title"] for item in plan["pull_remove"]],
+        }
+        return summary
+    
+    creating = {item["index"]: item for item in plan["push_create"]}
+    matched = {item["index"] for item in plan["matched"]}
+    removed = {item["index"] for item in plan["pull_remove"]}
+    items_by_id = {item["id"]: item for item in items if item["id"] and item["index"] not in creating}
+    inserts = new_lines(plan["pull_add"], remote, items_by_id)
+    sync_mark = (started - SYNC_OVERLAP).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    results, failures = {}, {}
+    created, create_failures = {}, {}
+    
+    def save_progress():
+        # Rewrites the note and the state for the writes finished so far. It
+        # runs after every batch, so if the sync is interrupted the tasks it
+        # already created keep their IDs and aren't created again next time.
+        
+        # Local: edit only the affected lines
+        replace = {}
+        for item in items:
+            task_id = item["id"]
+            if item["index"] in created:
+                replace[item["index"]] = render_line(item["indent"], item, created[item["index"]]["id"])
+            elif (task_id in plan["pull_update"] or item["index"] in matched) and item["index"] not in creating:
+                fields = {field: item[field] for field in FIELDS + ("done",)}
+                fields.update(plan["pull_update"].get(task_id, {}))
+                replace[item["index"]] = render_line(item["indent"], fields, task_id)
+        
+        if replace or removed or inserts:
+            output = []
+            for index, line in enumerate(lines):
+                if index not in removed:
+                    output.append(replace.get(index, line))
+                output.extend(inserts.get(index, []))
+            output.extend(inserts.get(-1, []))
+            tmp_path = note.with_name(f".{note.name}.tmp")
+            tmp_path.write_text("\n".join(output) + "\n", encoding="utf-8")
+            os.replace(tmp_path, note)
+        
+        # New base: what both sides now agree on. Writes that failed or
+        # haven't run yet keep Google's current version, so the next sync
+        # retries them.
+        new_base = {}
+        for item in items:
+            task_id = item["id"]
+            if item["index"] in created:
+                new_base[created[item["index"]]["id"]] = task_fields(created[item["index"]])
+            elif item["index"] in creating or item["index"] in removed:
+                continue
+            else:
+                fields = dict(remote[task_id])
+                fields.update(plan["pull_update"].get(task_id, {}))
+                if ("patch", task_id) in results:
+                    fields.update(plan["push_update"].get(task_id, {}))
+                new_base[task_id] = fields
+        for task_id in plan["push_delete"]:
+            if ("delete", task_id) not in results:
+                new_base[task_id] = base[task_id]
+        for task_id in plan["pull_add"]:
+            new_base[task_id] = remote[task_id]
+        
+        state[key] = {"list_id": tasklist_id, "sync_mark": sync_mark, "tasks": new_base}
+        save_state(state)
+    
+    def batch_done(outcomes):
+        for request_key, response, error in outcomes:
+            if error is None:
+                results[request_key] = response
+            else:
+                failures[request_key] = error
+        save_progress()
+    
+    def create_done(node, task, error):
+        if task is not None:
+            created[node["key"]] = task
+        else:
+            create_failures[node["key"]] = error
+    
+    # Remote: patches and deletes in one set of batch requests, then new tasks level by level
+    requests = [(("patch", task_id), api.patch_request(tasklist_id, task_id, patch_body(fields)))
+                for task_id, fields in plan["push_update"].items()]
+    requests += [(("delete", task_id), api.delete_request(tasklist_id, task_id))
+                 for task_id in plan["push_delete"]]
+    
+    nodes = []
+    for item in plan["push_create"]:
+        task = patch_body({field: item[field] for field in FIELDS})
+        task = {field: value for field, value in task.items() if value is not None}
+        parent = item["parent"]
+        node = {"key": item["index"], "parent_key": None, "task": task}
+        if parent and parent["index"] in creating:
+            node["parent_key"] = parent["index"]
+        elif parent and parent["id"]:
+            task["parent"] = parent["id"]
+        nodes.append(node)
+    
+    try:
+        if requests:
+            api.batch_execute(requests, batch_size=batch_size, workers=workers, on_batch=batch_done)
+        if nodes:
+            api.create_task_tree(tasklist_id, nodes, batch_size=batch_size, workers=workers,
+                                 on_result=create_done, on_batch=save_progress)
+    finally:
+        save_progress()
+    
+    for (action, task_id), error in failures.items():
+        summary["errors"].append({"task_id": task_id, "action": action, "error": str(error)})
+    for index, error in create_failures.items():
+        summary["errors"].append({"title": creating[index]["title"], "action": "create", "error": str(error)})
+    
+    summary["api_writes"] = len(requests) + len(nodes)
+    return summary
+
+def main():
+    args = parse_args()
+    api = GoogleTasksAPI()
+    
+    # Use default list if not specified
+    tasklist_id = args.list_id or '@default'
+    
+    try:
+        summary = sync_note(api, Path(args.note), tasklist_id, dry_run=args.dry_run,
+                            batch_size=args.batch_size, workers=args.workers)
+    except Exception as e:
+        print(f"Error: Sync failed: {e}", file=sys.stderr)
+        return 1
+    
+    pushed, pulled = summary["pushed"], summary["pulled"]
+    print(f"✓ Google Tasks: {pushed['created']} created, {pushed['updated']} updated, {pushed['deleted']} deleted; "
+          f"note: {pulled['matched']} linked, {pulled['added']} added, {pulled['updated']} updated, {pulled['removed']} removed", file=sys.stderr)
+    for error in summary["errors"]:
+        print(f"✗ Failed to {error['action']} {error.get('title') or error.get('task_id')}: {error['error']}",
+              file=sys.stderr)
+    
+    summary["success"] = len(summary["errors"]) == 0
+    print_json(summary)
+    
+    return 0 if summary["success"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Local SQLite cache of Google Tasks lists and tasks.
+
+The first sync of a list downloads every task. Later syncs ask only for
+tasks updated since the previous sync (updatedMin), including deleted ones
+(showDeleted), so edits and deletions both reach the cache. Queries are
+answered from the cache; a list is re-synced only when its last sync is
+older than the caller's max_age.
+"""
+
+import sys
+import json
+import time
+import sqlite3
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Optional, Dict, List, Iterator, Callable
+
+SKILL_DIR = Path(__file__).parent.parent
+CACHE_FILE = SKILL_DIR / "tasks_cache.db"
+
+# Seconds a list may go without a sync before queries refresh it.
+DEFAULT_MAX_AGE = 300
+# updatedMin is set this far before the previous sync started, so a task
+# edited while that sync was running (or under clock skew) is not missed.
+SYNC_OVERLAP = timedelta(minutes=2)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasklists (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    updated TEXT,
+    synced_at REAL,
+    sync_mark TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    list_id TEXT NOT NULL,
+    title TEXT,
+    status TEXT,
+    due TEXT,
+    parent TEXT,
+    updated TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_status_due ON tasks (list_id, status, due);
+CREATE INDEX IF NOT EXISTS tasks_due ON tasks (list_id, due);
+CREATE INDEX IF NOT EXISTS tasks_parent ON tasks (list_id, parent);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def _rfc3339(dt: datetime) -> str:
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+class TaskCache:
+    """Task lists and tasks mirrored in SQLite.
+
+    `api_factory` is called (at most once) only when the cache needs the
+    network, so fresh-cache queries don't even load credentials.
+    """
+
+    def __init__(self, api_factory: Callable, path: Path = None):
+        self.api_factory = api_factory
+        self._api = None
+        self.path = Path(path or CACHE_FILE)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(SCHEMA)
+
+    @property
+    def api(self):
+        if self._api is None:
+            self._api = self.api_factory()
+        return self._api
+
+    def close(self):
+        self.conn.close()
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+    # Task lists
+
+    def sync_lists(self):
+        """Refresh the task lists, dropping lists (and their tasks) deleted remotely."""
+        lists = list(self.api.iter_task_lists())
+        with self.conn:
+            for tasklist in lists:
+                self.conn.execute(
+                    "INSERT INTO tasklists (id, title, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET title = excluded.title, updated = excluded.updated",
+                    (tasklist['id'], tasklist.get('title'), tasklist.get('updated')))
+            ids = [tasklist['id'] for tasklist in lists]
+            marks = ','.join('?' * len(ids))
+            self.conn.execute(f"DELETE FROM tasks WHERE list_id NOT IN ({marks})", ids)
+            self.conn.execute(f"DELETE FROM tasklists WHERE id NOT IN ({marks})", ids)
+            self._set_state('lists_synced_at', str(time.time()))
+
+    def task_lists(self, max_age: float = DEFAULT_MAX_AGE) -> List[Dict]:
+        synced_at = float(self._get_state('lists_synced_at') or 0)
+        if time.time() - synced_at > max_age:
+            self.sync_lists()
+        rows = self.conn.execute("SELECT id, title, updated FROM tasklists ORDER BY title")
+        return [{'id': r[0], 'title': r[1], 'updated': r[2]} for r in rows]
+
+    def resolve_list(self, tasklist_id: str) -> str:
+        """Map '@default' to the real list ID (looked up once, then remembered)."""
+        if tasklist_id != '@default':
+            return tasklist_id
+        default_id = self._get_state('default_list_id')
+        if default_id is None:
+            task_list = self.api.get_task_list('@default')
+            if task_list is None:
+                raise RuntimeError("Could not look up the default task list")
+            default_id = task_list['id']
+            with self.conn:
+                self._set_state('default_list_id', default_id)
+        return default_id
+
+    def list_title(self, tasklist_id: str) -> Optional[str]:
+        row = self.conn.execute("SELECT title FROM tasklists WHERE id = ?", (tasklist_id,)).fetchone()
+        return row[0] if row else None
+
+    # Tasks
+
+    def sync(self, tasklist_id: str, full: bool = False) -> Dict:
+        """Fetch tasks changed since the last sync of this list (everything on the first)."""
+        row = self.conn.execute("SELECT sync_mark FROM tasklists WHERE id = ?", (tasklist_id,)).fetchone()
+        mark = None if full or not row else row[0]
+        started = datetime.now(timezone.utc)
+
+        changed = deleted = 0
+        with self.conn:
+            if mark is None:
+                self.conn.execute("DELETE FROM tasks WHERE list_id = ?", (tasklist_id,))
+            tasks = self.api.iter_tasks(tasklist_id, show_completed=True, show_hidden=True,
+                                        show_deleted=mark is not None, updated_min=mark)
+            for task in tasks:
+                if task.get('deleted'):
+                    self.conn.execute("DELETE FROM tasks WHERE id = ?", (task['id'],))
+                    deleted += 1
+                    continue
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO tasks (id, list_id, title, status, due, parent, updated, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (task['id'], tasklist_id, task.get('title'), task.get('status', 'needsAction'),
+                     task.get('due'), task.get('parent'), task.get('updated'), json.dumps(task)))
+                changed += 1
+            self.conn.execute(
+                "INSERT INTO tasklists (id, synced_at, sync_mark) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET synced_at = excluded.synced_at, sync_mark = excluded.sync_mark",
+                (tasklist_id, time.time(), _rfc3339(started - SYNC_OVERLAP)))
+
+        return {'list_id': tasklist_id, 'mode': 'full' if mark is None else 'incremental',
+                'changed': changed, 'deleted': deleted}
+
+    def ensure_fresh(self, tasklist_id: str, max_age: float = DEFAULT_MAX_AGE) -> str:
+        """Resolve the list ID and re-sync it if the cached copy is older than max_age seconds.
+
+        If the sync fails but the list was cached before, the stale copy is
+        used and a warning printed.
+        """
+        tasklist_id = self.resolve_list(tasklist_id)
+        row = self.conn.execute("SELECT synced_at FROM tasklists WHERE id = ?", (tasklist_id,)).fetchone()
+        synced_at = row[0] if row and row[0] else None
+        if synced_at is not None and time.time() - synced_at <= max_age:
+            return tasklist_id
+        try:
+            if self.list_title(tasklist_id) is None:
+                self.sync_lists()
+            self.sync(tasklist_id)
+        except Exception as e:
+            if synced_at is None:
+                raise
+            age = int(time.time() - synced_at)
+            print(f"Warning: Sync failed ({e}); using cached tasks from {age}s ago", file=sys.stderr)
+        return tasklist_id
+
+    def query(self, tasklist_id: str, status: str = "needsAction", due_min: Optional[str] = None,
+              due_max: Optional[str] = None, updated_min: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """Tasks of a cached list, earliest due first (no due date last)."""
+        sql = "SELECT data FROM tasks WHERE list_id = ?"
+        params = [tasklist_id]
+        if status in ("needsAction", "completed"):
+            sql += " AND status = ?"
+            params.append(status)
+        if due_min:
+            sql += " AND due >= ?"
+            params.append(due_min)
+        if due_max:
+            sql += " AND due < ?"
+            params.append(due_max)
+        if updated_min:
+            sql += " AND updated >= ?"
+            params.append(updated_min)
+        sql += " ORDER BY due IS NULL, due"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [json.loads(row[0]) for row in self.conn.execute(sql, params)]
+
+    def iter_tasks(self, tasklist_id: str, status: str = "all") -> Iterator[Dict]:
+        """Stream a cached list's tasks without loading them all at once."""
+        sql = "SELECT data FROM tasks WHERE list_id = ?"
+        params = [tasklist_id]
+        if status in ("needsAction", "completed"):
+            sql += " AND status = ?"
+            params.append(status)
+        for row in self.conn.execute(sql, params):
+            yield json.loads(row[0])
+
+    def children(self, tasklist_id: str, parent_id: Optional[str]) -> List[Dict]:
+        """Direct subtasks of a task (top-level tasks for None), in list order."""
+        if parent_id is None:
+            rows = self.conn.execute(
+                "SELECT data FROM tasks WHERE list_id = ? AND parent IS NULL", (tasklist_id,))
+        else:
+            rows = self.conn.execute(
+                "SELECT data FROM tasks WHERE list_id = ? AND parent = ?", (tasklist_id, parent_id))
+        return sorted((json.loads(row[0]) for row in rows), key=lambda t: t.get('position', ''))
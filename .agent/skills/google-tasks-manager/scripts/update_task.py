@@ -56,33 +56,32 @@ def main():
     # Use default list if not specified
     tasklist_id = args.list_id or '@default'
     
-    # Get current task
-    current_task = api.get_task(tasklist_id, args.task_id)
+    # Send only the fields being changed
+    fields = {}
     
-    if current_task is None:
-        print("Error: Failed to fetch current task", file=sys.stderr)
-        return 1
-    
-    # Build update data (start with current task to preserve fields)
-    update_data = current_task.copy()
-    
-    # Update only specified fields
     if args.title is not None:
-        update_data["title"] = args.title
+        fields["title"] = args.title
     
     if args.notes is not None:
-        update_data["notes"] = args.notes
+        fields["notes"] = args.notes
     
     if args.due_date is not None:
         due_date = parse_date(args.due_date)
         if due_date:
-            update_data["due"] = due_date
+            fields["due"] = due_date
     
     if args.status is not None:
-        update_data["status"] = args.status
+        fields["status"] = args.status
+        if args.status == "needsAction":
+            # Reopening: clear the completion time as well
+            fields["completed"] = None
+    
+    if not fields:
+        print("Error: Nothing to update. Pass --title, --notes, --due-date or --status", file=sys.stderr)
+        return 1
     
     # Update the task
-    result = api.update_task(tasklist_id, args.task_id, update_data)
+    result = api.patch_task(tasklist_id, args.task_id, fields)
     
     if result is None:
         print("Error: Failed to update task", file=sys.stderr)